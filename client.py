@@ -3,15 +3,21 @@ import sys
 import struct
 import time
 
-with serial.Serial(sys.argv[1], 115200) as ser:
+from host.lux import packet, CMD_FRAME, BROADCAST
+from host.record import Recorder
+
+# an optional second argument records everything sent to a trace
+port = serial.Serial(sys.argv[1], 115200)
+if len(sys.argv) > 2:
+    port = Recorder(port, sys.argv[2])
+
+with port as ser:
     i = 0
     while True:
         i += 1
         pixels = [0]*8
         pixels[i%8] = 0xffffff
-        for value in pixels:
-            dat = struct.pack('>L', value)[1:]
-            #print(dat.hex())
-            ser.write(dat)
+        dat = b''.join(struct.pack('>L', value)[1:] for value in pixels)
+        #print(dat.hex())
+        ser.write(packet(BROADCAST, CMD_FRAME, dat))
         time.sleep(0.1)
-
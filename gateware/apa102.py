@@ -0,0 +1,176 @@
+from migen import *
+
+from .util import closest_divisor
+
+
+class APA102PHY(Module):
+    def __init__(self, pads, data_width, freq_base, freq_tx=3e6):
+        self.pads = pads
+
+        self.tx_ack = Signal() # out
+        self.tx_ready = Signal() # in
+        self.data = Signal(data_width) #in
+
+
+        ###
+
+        self.reg = Signal(data_width)
+        self.strobe = Signal()
+
+        ###
+
+        # two strobes per bit: one for each clock phase
+        divisor = closest_divisor(freq_base, freq_tx * 2, max_ppm=50000)
+        self.counter = Signal(max=max(divisor, 2)) # at divisor 1 the strobe is always high
+
+        self.sync += If(self.counter == 0,
+            self.strobe.eq(1),
+            self.counter.eq(divisor - 1)
+        ).Else(
+            self.strobe.eq(0),
+            self.counter.eq(self.counter - 1)
+        )
+
+
+        self.submodules.tx_fsm = FSM(reset_state='IDLE')
+
+        self.tx_fsm.act('IDLE',
+            self.tx_ack.eq(1),
+            If(self.tx_ready,
+                NextValue(self.reg, self.data),
+                NextState('LOW')
+            ),
+        )
+
+        # data changes on the falling edge, and is sampled by the LEDs on the rising edge
+        self.bitno = Signal(max=data_width)
+        self.tx_fsm.act('LOW',
+            If(self.strobe,
+                NextValue(self.pads.clk, 0),
+                NextValue(self.pads.data, self.reg[-1]),
+                NextState('HIGH'),
+            )
+        )
+
+        self.tx_fsm.act('HIGH',
+            If(self.strobe,
+                NextValue(self.pads.clk, 1),
+                NextValue(self.reg, Cat(0, self.reg[0:-1])),
+                NextValue(self.bitno, self.bitno + 1),
+                If(self.bitno == data_width-1,
+                    NextValue(self.bitno, 0),
+                    NextState('IDLE'),
+                ).Else(
+                    NextState('LOW'),
+                )
+            )
+        )
+
+class APA102Controller(Module):
+    """
+    APA102/SK9822 strip driver
+
+    Drop-in alternative to WS2812Controller for clocked LEDs. Every frame is a start frame
+    of 32 zero bits, one 32-bit word per pixel carrying the global brightness and the
+    24-bit pixel as-is (the LEDs expect blue, green, red), and an end frame of zero bits:
+    32 for the SK9822 latch plus one per two pixels to clock the data through the strip.
+
+    Parameters
+    ----------
+    pads : {clk, data}
+
+    in_fifo : FIFO-like
+        Source of pixels; a frame ends when it is no longer readable.
+
+    freq_base : int
+        Base clock domain frequency.
+
+    freq_tx : int
+        LED clock frequency.
+
+    Attributes
+    ----------
+    write_en : in
+        Starts a frame.
+
+    busy : out
+        High from the start of a frame until its end frame has been sent.
+
+    brightness : in
+        5-bit brightness applied to every pixel. Resets to full brightness.
+    """
+    def __init__(self, pads, in_fifo, freq_base, **kwargs):
+        self.write_en = Signal()
+        self.busy = Signal()
+        self.brightness = Signal(5, reset=31)
+
+        ###
+
+        # the next word is a pixel rather than a start or end frame word
+        pixel = Signal()
+
+        # end frame words to send, one plus a bit per two pixels, counted as pixels are sent
+        # in blocks of 64
+        count = Signal(6)
+        trailer = Signal(11)
+
+        self.submodules.phy = APA102PHY(pads, 32, freq_base, **kwargs)
+
+        # the PHY latches the word as it accepts it, so pixels are taken straight from in_fifo
+        self.comb += self.phy.data.eq(Mux(pixel, Cat(in_fifo.dout, self.brightness, 0b111), 0))
+
+        self.submodules.framing_fsm = FSM()
+        self.framing_fsm.act('IDLE',
+            If(self.write_en,
+                NextValue(pixel, 0), # start frame
+                NextValue(count, 0),
+                NextValue(trailer, 2),
+                NextState('WRITE')
+            )
+        )
+
+        self.framing_fsm.act('DEQUEUE',
+            If(in_fifo.readable,
+                NextValue(pixel, 1),
+                NextValue(count, count + 1),
+                If(count == 63,
+                    NextValue(trailer, trailer + 1),
+                ),
+                NextState('WRITE'),
+            ).Else(
+                NextValue(pixel, 0),
+                NextState('END'),
+            )
+        )
+
+        self.framing_fsm.act('WRITE',
+            If(self.phy.tx_ack,
+                in_fifo.re.eq(pixel),
+                self.phy.tx_ready.eq(1),
+                NextState('WRITE-WAIT')
+            )
+        )
+
+        self.framing_fsm.act('WRITE-WAIT',
+            If(self.phy.tx_ack,
+                NextState('DEQUEUE')
+            )
+        )
+
+        self.framing_fsm.act('END',
+            If(trailer == 0,
+                NextState('IDLE'),
+            ).Elif(self.phy.tx_ack,
+                self.phy.tx_ready.eq(1),
+                NextValue(trailer, trailer - 1),
+                NextState('END-WAIT'),
+            )
+        )
+
+        self.framing_fsm.act('END-WAIT',
+            If(self.phy.tx_ack,
+                NextState('END')
+            )
+        )
+
+        self.comb += self.busy.eq(~self.framing_fsm.ongoing('IDLE'))
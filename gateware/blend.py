@@ -0,0 +1,207 @@
+from migen import *
+from migen.genlib.divider import Divider
+
+
+class Blender(Module):
+    """
+    Crossfade between keyframes
+
+    Sits between a framebuffer and an LED controller. When a new frame is swapped in, each
+    channel of each pixel is interpolated linearly from what was on display at that moment
+    to the new frame over the following steps refreshes, so the host only needs to send
+    keyframes.
+
+    Both sides are FIFO-like: pixels are taken from in_fifo and offered to the LED
+    controller in the same order. Every pixel takes a few cycles to blend, during which
+    readable is low; this is far less than the LEDs take to clock out the previous pixel,
+    so the LED controllers never see a gap in the frame.
+
+    Parameters
+    ----------
+    in_fifo : FIFO-like
+        Source of pixels.
+
+    depth : int
+        Maximum number of pixels in a frame.
+
+    Attributes
+    ----------
+    steps : in
+        Length of a fade, in refreshes. Fades are disabled at 0 or 1.
+
+    start : in
+        High for one cycle when in_fifo begins a refresh. Takes effect once the last pixel
+        of the previous refresh has been read.
+
+    swapped : in
+        High together with start if the refresh shows a new frame.
+
+    dout : out
+        Blended pixel. Valid when readable is high.
+
+    readable : out
+        High when dout holds a blended pixel.
+
+    re : in
+        Acknowledges dout.
+    """
+    def __init__(self, in_fifo, depth):
+        self.steps = Signal(16)
+        self.start = Signal()
+        self.swapped = Signal()
+
+        self.dout = Signal(24)
+        self.readable = Signal()
+        self.re = Signal()
+
+        ###
+
+        # what each pixel showed last, and what it showed when the current fade began
+        last = Memory(24, depth)
+        origin = Memory(24, depth)
+        last_rd = last.get_port()
+        last_wr = last.get_port(write_capable=True)
+        origin_rd = origin.get_port()
+        origin_wr = origin.get_port(write_capable=True)
+        self.specials += last, origin, last_rd, last_wr, origin_rd, origin_wr
+
+        # refresh of the current fade; the first refresh after a swap is refresh 1
+        t = Signal(16)
+        fading = Signal()
+
+        # the current refresh is the first one of a fade, which records its origin
+        fresh = Signal()
+
+        # blend factor, from 0 (origin) to 256 (new frame)
+        alpha = Signal(9)
+
+        # the divider works out alpha in the cycles after a refresh begins
+        compute = Signal()
+        self.submodules.divider = Divider(24)
+
+        # a refresh begins once the last pixel of the previous one has left the pipeline
+        begin = Signal()
+        deferred = Signal()
+        deferred_swap = Signal()
+        swap = Signal()
+
+        self.submodules.fsm = FSM()
+
+        ###
+
+        self.comb += [
+            begin.eq((self.start | deferred) & self.fsm.ongoing('WAIT')),
+            swap.eq(Mux(deferred, deferred_swap, self.swapped)),
+        ]
+
+        self.sync += [
+            If(begin,
+                deferred.eq(0),
+            ).Elif(self.start,
+                deferred.eq(1),
+                deferred_swap.eq(self.swapped),
+            ),
+
+            compute.eq(begin),
+
+            If(begin,
+                If(swap,
+                    t.eq(1),
+                    fading.eq(self.steps > 1),
+                    fresh.eq(1),
+                ).Else(
+                    fresh.eq(0),
+                    If(t >= self.steps,
+                        fading.eq(0),
+                    ).Else(
+                        t.eq(t + 1),
+                    )
+                )
+            )
+        ]
+
+        self.comb += [
+            self.divider.start_i.eq(compute),
+            self.divider.dividend_i.eq(Cat(Replicate(0, 8), t)),
+            self.divider.divisor_i.eq(self.steps),
+            alpha.eq(Mux(fading, self.divider.quotient_o, 256)),
+        ]
+
+        ### PIXEL PIPELINE ###
+
+        index = Signal(max=depth)
+        index_next = Signal(max=depth)
+
+        # the pixel being blended, one channel at a time
+        to = Signal(24)
+        frm = Signal(24)
+        out = Signal(24)
+        channel = Signal(2)
+
+        # the displayed value recorded as this pixel's origin at the start of a fade
+        shown = Signal(24)
+
+        diff = Signal((9, True))
+        product = Signal((18, True))
+        result = Signal(8)
+
+        ###
+
+        # the memories are read at the *next* index, so that their outputs are ready as
+        # soon as the next pixel arrives
+        self.comb += [
+            If(begin,
+                index_next.eq(0),
+            ).Elif(self.readable & self.re,
+                index_next.eq(index + 1),
+            ).Else(
+                index_next.eq(index),
+            ),
+
+            last_rd.adr.eq(index_next),
+            origin_rd.adr.eq(index_next),
+
+            last_wr.adr.eq(index),
+            last_wr.dat_w.eq(out),
+            last_wr.we.eq(self.readable & self.re),
+
+            origin_wr.adr.eq(index),
+            origin_wr.dat_w.eq(shown),
+            origin_wr.we.eq(self.readable & self.re & fresh),
+        ]
+        self.sync += index.eq(index_next)
+
+        self.comb += [
+            diff.eq(to[:8] - frm[:8]),
+            product.eq(diff * alpha),
+            result.eq(frm[:8] + (product >> 8)),
+            self.dout.eq(out),
+        ]
+
+        self.fsm.act('WAIT',
+            If(in_fifo.readable & ~begin & ~compute & self.divider.ready_o,
+                in_fifo.re.eq(1),
+                NextValue(to, in_fifo.dout),
+                NextValue(frm, Mux(fresh, last_rd.dat_r, origin_rd.dat_r)),
+                NextValue(shown, last_rd.dat_r),
+                NextValue(channel, 0),
+                NextState('BLEND'),
+            )
+        )
+
+        self.fsm.act('BLEND',
+            NextValue(to, Cat(to[8:], to[:8])),
+            NextValue(frm, Cat(frm[8:], frm[:8])),
+            NextValue(out, Cat(out[8:], result)),
+            NextValue(channel, channel + 1),
+            If(channel == 2,
+                NextState('OUT'),
+            )
+        )
+
+        self.fsm.act('OUT',
+            self.readable.eq(1),
+            If(self.re,
+                NextState('WAIT'),
+            )
+        )
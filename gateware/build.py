@@ -0,0 +1,174 @@
+"""
+Cached, parallel builds of TopModule for the icestick.
+
+    python -m gateware.build
+    python -m gateware.build n_pixels=300,baud_rate=1000000
+    python -m gateware.build -j 4 n_pixels=8 n_pixels=300 led=apa102
+
+The generated design (Verilog, memory contents, constraints, and the yosys and toolchain
+scripts carrying the toolchain options) is hashed, and the toolchain only runs when no
+earlier build of an identical design is found in the cache. A single design is flashed
+once built; several are built concurrently, each into its own directory, and not flashed.
+
+Upgrading the toolchain itself does not change the hash: clear the cache afterwards.
+"""
+import argparse
+import hashlib
+import inspect
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from migen.build.platforms import icestick
+
+from .top import TopModule
+
+
+# changes whenever the contents of cache entries do
+CACHE_VERSION = 1
+
+# lets abc optimise across flip-flops; without it the default design is too close to the
+# size of the ice40hx1k for nextpnr to place it reliably
+SYNTH_OPTS = '-dff'
+
+
+def design_hash(directory):
+    """
+    Hash of the names and contents of every file in a directory of build inputs.
+    """
+    digest = hashlib.sha256(b'luna %d\0' % CACHE_VERSION)
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), 'rb') as f:
+            data = f.read()
+        digest.update(name.encode() + b'\0' + len(data).to_bytes(8, 'little') + data)
+    return digest.hexdigest()
+
+
+def _run_script(directory, build_name):
+    # the script migen wrote, run as migen would run it
+    if sys.platform in ('win32', 'cygwin'):
+        command = ['cmd', '/c', 'build_{}.bat'.format(build_name)]
+    else:
+        command = ['bash', 'build_{}.sh'.format(build_name)]
+
+    if subprocess.call(command, cwd=directory) != 0:
+        raise OSError("Subprocess failed")
+
+
+def cached_build(plat, top, build_dir='build', cache_dir='build/cache', build_name='top', **kwargs):
+    """
+    Builds top into build_dir like plat.build, reusing the bitstream and reports of an
+    identical design from cache_dir if there is one.
+
+    Returns the design hash, and whether the build was found in the cache.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # the design is generated from scratch, so that leftovers of earlier builds in
+    # build_dir cannot affect the hash
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=cache_dir)
+    try:
+        plat.build(top, build_dir=staging, build_name=build_name, run=False, **kwargs)
+        key = design_hash(staging)
+        entry = os.path.join(cache_dir, key)
+
+        hit = os.path.isdir(entry)
+        if not hit:
+            _run_script(staging, build_name)
+            try:
+                os.rename(staging, entry)
+            except OSError:
+                pass # a concurrent build of the same design got there first
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    os.makedirs(build_dir, exist_ok=True)
+    for name in os.listdir(entry):
+        shutil.copy2(os.path.join(entry, name), build_dir)
+
+    return key, hit
+
+
+def parse_variant(text):
+    """
+    Parses TopModule options written as 'n_pixels=300,baud_rate=1000000,rs485=True'.
+
+    Raises ValueError for options TopModule does not take, before anything is built.
+    """
+    known = set(inspect.signature(TopModule).parameters) - {'plat'}
+    options = {}
+    for item in filter(None, text.split(',')):
+        key, _, value = item.partition('=')
+        if key not in known:
+            raise ValueError("Unknown option {!r}, expected one of {}".format(key, ', '.join(sorted(known))))
+        if value in ('True', 'False'):
+            options[key] = value == 'True'
+            continue
+        try:
+            options[key] = int(value, 0)
+        except ValueError:
+            options[key] = value
+    return options
+
+
+def variant_name(options):
+    return '_'.join('{}-{}'.format(key, value) for key, value in sorted(options.items())) or 'default'
+
+
+def build_variant(options, build_dir='build', cache_dir='build/cache'):
+    """
+    Elaborates and builds TopModule(**options).
+
+    Returns the design hash, whether the build was found in the cache, and the time taken.
+    """
+    start = time.monotonic()
+    plat = icestick.Platform()
+    top = TopModule(plat, **options)
+    key, hit = cached_build(plat, top, build_dir, cache_dir, synth_opts=SYNTH_OPTS)
+    return key, hit, time.monotonic() - start
+
+
+def build_variants(variants, build_dir='build', cache_dir='build/cache', jobs=None):
+    """
+    Builds several variants concurrently, each in a subdirectory of build_dir named after
+    its options. Returns the results of build_variant for each.
+    """
+    with ProcessPoolExecutor(jobs) as executor:
+        futures = [
+            executor.submit(build_variant, options, os.path.join(build_dir, variant_name(options)), cache_dir)
+            for options in variants
+        ]
+        return [future.result() for future in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('variants', nargs='*', type=parse_variant, metavar='OPTIONS',
+        help="TopModule options, e.g. n_pixels=300,baud_rate=1000000")
+    parser.add_argument('--build-dir', default='build')
+    parser.add_argument('--cache-dir', help="defaults to cache/ in the build directory")
+    parser.add_argument('-j', '--jobs', type=int, help="concurrent builds, defaults to the number of cores")
+    parser.add_argument('--no-flash', action='store_true')
+    args = parser.parse_args()
+
+    cache_dir = args.cache_dir or os.path.join(args.build_dir, 'cache')
+    variants = args.variants or [{}]
+
+    if len(variants) > 1:
+        results = build_variants(variants, args.build_dir, cache_dir, args.jobs)
+    else:
+        results = [build_variant(variants[0], args.build_dir, cache_dir)]
+
+    for options, (key, hit, elapsed) in zip(variants, results):
+        print('{:40} {} {:6} {:.1f}s'.format(variant_name(options), key[:12], 'cached' if hit else 'built', elapsed))
+
+    if len(results) == 1 and not args.no_flash:
+        icestick.Platform().create_programmer().flash(0, os.path.join(args.build_dir, 'top.bin'))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
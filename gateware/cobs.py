@@ -4,6 +4,12 @@ from migen.genlib.fsm import FSM, NextValue, NextState
 class COBS(Module):
     """
     Implements streaming consistent-overhead byte stuffing.
+
+    Zero octets delimit packets: each one pulses eop, and additionally error if it
+    arrives in the middle of a block. An octet may be presented on every cycle; decoded
+    octets appear on dout, with outrdy high, on the following cycle, and eop and error
+    follow a delimiter by a cycle too, so they always come after the last octet of the
+    packet.
     """
 
     def __init__(self):
@@ -12,37 +18,69 @@ class COBS(Module):
 
         self.dout = Signal(8)
         self.outrdy = Signal()
+        self.eop = Signal()
+        self.error = Signal()
+
+        # data octets left in the current block, and whether it is a full one, which is not
+        # followed by a zero
+        remaining = Signal(8)
+        full = Signal()
 
-        ctr = Signal(8)
+        # the last block ended in a zero, which is output once the next block begins
         dumpzero = Signal()
 
+        # a delimiter, and whether it damaged the packet, registered into eop and error
+        delimiter = Signal()
+        damaged = Signal()
+        self.sync += [
+            self.eop.eq(delimiter),
+            self.error.eq(damaged),
+        ]
+
         self.submodules.fsm = FSM()
         self.fsm.act('IDLE',
             If(self.inclk,
-                NextValue(ctr, self.din),
-                NextState('DECODING'),
-                If(dumpzero,
+                If(self.din == 0, # packet delimiter
+                    delimiter.eq(1),
+                    NextValue(dumpzero, 0), # the last block's trailing zero is not part of the packet
+                    NextValue(self.outrdy, 0),
+                ).Else(
                     NextValue(self.dout, 0),
-                    NextValue(self.outrdy, 1),
-                ),
+                    NextValue(self.outrdy, dumpzero),
+                    NextValue(full, self.din == 255),
+                    NextValue(remaining, self.din - 1),
+                    If(self.din == 1, # an empty block ends straight away
+                        NextValue(dumpzero, 1),
+                    ).Else(
+                        NextState('DECODING'),
+                    )
+                )
+            ).Else(
+                NextValue(self.outrdy, 0),
             )
         )
 
-        bits_out_count = Signal(9)
+        # the octet completing a block moves straight on to the next code, so that
+        # octets may arrive on every cycle
         self.fsm.act('DECODING',
-            If(bits_out_count < ctr - 1, # if we haven't finished with this block yet
-                If(self.inclk, # wait for next data bit
+            If(self.inclk,
+                If(self.din == 0, # delimiter in the middle of a block, the packet is damaged
+                    delimiter.eq(1),
+                    damaged.eq(1),
+                    NextValue(dumpzero, 0),
+                    NextValue(self.outrdy, 0),
+                    NextState('IDLE'),
+                ).Else(
                     NextValue(self.dout, self.din),
                     NextValue(self.outrdy, 1),
-                    NextValue(bits_out_count, bits_out_count + 1),
-                ).Else(
-                    NextValue(self.outrdy, 0),
+                    NextValue(remaining, remaining - 1),
+                    If(remaining == 1, # done with block
+                        # blocks shorter than 255 octets are followed by a zero
+                        NextValue(dumpzero, ~full),
+                        NextState('IDLE'),
+                    )
                 )
-            ).Else( # done with block?
-                # append trailing 0x0 to block if it's shorter than 255 bytes
-                NextValue(dumpzero, ctr < 255),
-                NextValue(bits_out_count, 0),
+            ).Else(
                 NextValue(self.outrdy, 0),
-                NextState('IDLE'),
             )
         )
@@ -0,0 +1,296 @@
+from migen import *
+
+from .util import UncheckedMemory
+
+
+class Framebuffer(Module):
+    """
+    Triple-buffered pixel memory
+
+    Pixels are written into the back buffer in any order. Once the back buffer holds a
+    complete frame the writer asserts `commit`, and it becomes the ready buffer, while the
+    old ready buffer takes its place as the back buffer. On the next `tick` the ready
+    buffer, if it holds a frame which has not been displayed yet, is swapped with the
+    front buffer, and the front buffer is scanned out in order through a FIFO-like read
+    interface. A tick without a committed frame scans out the previous frame again. The
+    writer never touches a committed frame, so a host streaming frames back-to-back has
+    the latest complete one displayed on every tick.
+
+    Right after a commit the committed frame is copied into the new back buffer in the
+    background, skipping pixels the writer has written since and giving way to it whenever
+    it writes. The copy shares the read port with the scanout, and takes it in the cycles
+    the scanout does not move. The back buffer therefore always holds the latest frame
+    wherever the writer has not written, and a writer may update just a few pixels of it.
+    Asserting `discard` rolls the back buffer back to the latest committed frame, undoing
+    every write since, by copying that frame again. A discard during a copy restarts it
+    and overwrites every pixel, holding the writer off until the copy has finished.
+
+    Parameters
+    ----------
+    data_width : int
+        Width of a pixel word.
+
+    depth : int
+        Number of pixels in each buffer.
+
+    Attributes
+    ----------
+    length : in
+        Number of pixels to scan out, up to depth. Resets to depth.
+
+    adr : in
+        Back buffer write address.
+
+    din : in
+        Back buffer write data.
+
+    we : in
+        Write enable. Must not be asserted while writable is low, nor together with commit.
+
+    writable : out
+        Low while a commit waits for the copy of the previous one to finish, which only
+        happens when commits are less than depth cycles apart, and after a discard during
+        a copy.
+
+    commit : in
+        Marks the back buffer as holding a complete frame, replacing any committed frame
+        which has not been displayed yet.
+
+    discard : in
+        Drops every write since the last commit. Must not be asserted together with commit.
+
+    tick : in
+        Starts a scanout, swapping the buffers first if a frame was committed. Ignored
+        while a scanout is still in progress.
+
+    started : out
+        High for one cycle when a tick starts a scanout.
+
+    swapped : out
+        High for one cycle when a tick swapped the buffers.
+
+    dout : out
+        Current pixel of the scanout. Valid when readable is high.
+
+    readable : out
+        High while a scanout is in progress.
+
+    re : in
+        Acknowledges dout and advances the scanout to the next pixel.
+    """
+    def __init__(self, data_width, depth):
+        self.length = Signal(max=depth + 1, reset=depth)
+
+        self.adr = Signal(max=depth)
+        self.din = Signal(data_width)
+        self.we = Signal()
+        self.writable = Signal()
+        self.commit = Signal()
+        self.discard = Signal()
+
+        self.tick = Signal()
+        self.started = Signal()
+        self.swapped = Signal()
+
+        self.dout = Signal(data_width)
+        self.readable = Signal()
+        self.re = Signal()
+
+        ###
+
+        index_bits = bits_for(depth - 1)
+
+        # the three buffers live in one memory; the top address bits select the bank. Every
+        # read port duplicates the memory, so the scanout and the copy share one. A fourth,
+        # unused bank rounds the depth up to a power of two, which lets the memory be built
+        # from blocks spanning every bank rather than from a block per bank and a multiplexer.
+        # Reads always come from another bank than the one being written
+        storage = UncheckedMemory(data_width, 4 << index_bits)
+        wrport = storage.get_port(write_capable=True)
+        rdport = storage.get_port(mode=READ_FIRST)
+        self.specials += storage, wrport, rdport
+
+        # which bank is being displayed, holds the next frame, and is being written
+        front = Signal(2, reset=0)
+        ready = Signal(2, reset=1)
+        back = Signal(2, reset=2)
+
+        # set when the ready buffer holds a complete frame which has not been displayed yet
+        pending = Signal()
+
+        # a commit which arrived during a copy, and waits for it to finish
+        deferred = Signal()
+        accept = Signal()
+
+        # the bank being scanned out from this cycle on
+        display = Signal(2)
+
+        # the bank holding the latest committed frame
+        latest = Signal(2)
+
+        # scanout position
+        scanning = Signal()
+        rd_ptr = Signal(max=depth)
+        rd_next = Signal(max=depth)
+
+        # the scanout takes the read port when it moves; the pixel it read is kept for
+        # the cycles after, while the copy uses the port
+        moving = Signal()
+        fresh = Signal()
+        held = Signal(data_width)
+
+        # copy of the committed frame into the back buffer; each word is written the cycle
+        # after it is read, unless the writer has written that pixel already, or takes the
+        # write port that cycle, in which case it is read again
+        copying = Signal()
+        source = Signal(2)
+        copy_ptr = Signal(max=depth)
+        issued = Signal()
+        issue = Signal()
+        fetched = Signal()
+        fetch_ptr = Signal(max=depth)
+        store = Signal()
+        retry = Signal()
+
+        # a copy restarted by a discard which overwrites every pixel, as the marks of an
+        # interrupted copy cannot tell the pixels it copied from those written since
+        flush = Signal()
+
+        # a pixel of the back buffer is up to date when its mark equals epoch, which flips
+        # on every commit; both the writer and the copy mark the pixels they write. The copy
+        # only uses a mark read in a cycle the writer does not write, and stores the pixel
+        # before the one it reads
+        marks = UncheckedMemory(1, depth)
+        mark_wr = marks.get_port(write_capable=True)
+        mark_rd = marks.get_port(mode=READ_FIRST)
+        self.specials += marks, mark_wr, mark_rd
+        epoch = Signal()
+
+        start = Signal()
+
+        ###
+
+        self.comb += [
+            start.eq(self.tick & ~scanning),
+            self.started.eq(start),
+            self.swapped.eq(start & pending),
+            display.eq(Mux(self.swapped, ready, front)),
+            accept.eq((self.commit | deferred) & ~copying),
+            latest.eq(Mux(pending, ready, front)),
+        ]
+
+        self.sync += [
+            If(self.swapped & accept,
+                front.eq(ready),
+                ready.eq(back),
+                back.eq(front),
+            ).Elif(self.swapped,
+                front.eq(ready),
+                ready.eq(front),
+            ).Elif(accept,
+                ready.eq(back),
+                back.eq(ready),
+            ),
+
+            If(accept,
+                pending.eq(1),
+            ).Elif(self.swapped,
+                pending.eq(0),
+            ),
+
+            If(accept,
+                deferred.eq(0),
+            ).Elif(self.commit,
+                deferred.eq(1),
+            ),
+        ]
+
+        self.comb += [
+            issue.eq(copying & ~issued & ~self.we & ~moving),
+            store.eq(fetched & ~self.we & (flush | (mark_rd.dat_r != epoch))),
+            retry.eq(fetched & self.we),
+            self.writable.eq(~deferred & ~flush),
+        ]
+        self.sync += [
+            If(accept,
+                copying.eq(1),
+                source.eq(back),
+                epoch.eq(~epoch),
+            ).Elif(self.discard,
+                # every mark goes stale, so the whole frame is copied again
+                copying.eq(1),
+                source.eq(latest),
+                If(copying,
+                    flush.eq(1),
+                ).Else(
+                    epoch.eq(~epoch),
+                ),
+            ).Elif(fetched & ~self.we & (fetch_ptr == depth - 1),
+                copying.eq(0),
+                flush.eq(0),
+            ),
+
+            If(accept | self.discard,
+                copy_ptr.eq(0),
+                issued.eq(0),
+            ).Elif(retry,
+                copy_ptr.eq(fetch_ptr),
+                issued.eq(0),
+            ).Elif(issue,
+                copy_ptr.eq(copy_ptr + 1),
+                issued.eq(copy_ptr == depth - 1),
+            ),
+
+            fetched.eq(issue),
+            fetch_ptr.eq(copy_ptr),
+        ]
+
+        self.comb += [
+            mark_rd.adr.eq(copy_ptr),
+            mark_wr.dat_w.eq(epoch),
+            If(self.we,
+                wrport.adr.eq(Cat(self.adr, back)),
+                wrport.dat_w.eq(self.din),
+                wrport.we.eq(1),
+                mark_wr.adr.eq(self.adr),
+                mark_wr.we.eq(1),
+            ).Else(
+                wrport.adr.eq(Cat(fetch_ptr, back)),
+                wrport.dat_w.eq(rdport.dat_r),
+                wrport.we.eq(store),
+                mark_wr.adr.eq(fetch_ptr),
+                mark_wr.we.eq(store),
+            ),
+        ]
+
+        # the read port is addressed with the *next* scanout position so that dout
+        # always holds the current pixel, like a first-word-fall-through FIFO.
+        self.comb += [
+            moving.eq(start | (self.readable & self.re)),
+            If(start,
+                rd_next.eq(0),
+            ).Elif(self.readable & self.re,
+                rd_next.eq(rd_ptr + 1),
+            ).Else(
+                rd_next.eq(rd_ptr),
+            ),
+
+            If(moving,
+                rdport.adr.eq(Cat(rd_next, display)),
+            ).Else(
+                rdport.adr.eq(Cat(copy_ptr, source)),
+            ),
+            self.dout.eq(Mux(fresh, rdport.dat_r, held)),
+            self.readable.eq(scanning),
+        ]
+        self.sync += [
+            rd_ptr.eq(rd_next),
+            fresh.eq(moving),
+            held.eq(self.dout),
+
+            If(start,
+                scanning.eq(self.length != 0),
+            ).Elif(self.readable & self.re & (rd_ptr == self.length - 1),
+                scanning.eq(0),
+            ),
+        ]
@@ -0,0 +1,167 @@
+from migen import *
+
+from .crc import LuxCRC
+
+
+# packet commands
+CMD_FRAME = 0x10
+CMD_SYNC = 0x11
+CMD_WRITE_RANGE = 0x12
+CMD_SET_ADDRESS = 0x20
+CMD_SET_GROUPS = 0x21
+CMD_SET_PERIOD = 0x22
+CMD_SET_LENGTH = 0x23
+CMD_SET_MAP = 0x24
+CMD_SET_BRIGHTNESS = 0x25
+CMD_SET_FADE = 0x26
+
+# destinations
+BROADCAST = 0xffffffff
+MULTICAST = 0x80000000
+
+
+class LuxReceiver(Module):
+    """
+    Lux packet receiver
+
+    Consumes the octets and packet delimiters produced by the COBS decoder. A packet
+    consists of a destination address, a command octet, a payload and a CRC-32 of
+    everything before it; multi-octet fields are little-endian:
+
+        destination (4) | command (1) | payload (n) | crc (4)
+
+    A packet is addressed to us if its destination is our address, the broadcast address,
+    or a multicast address (top bit set) sharing one of its 31 group bits with our groups.
+
+    Payload octets are streamed out as they arrive, four octets behind the input. The CRC
+    is only known at the end of the packet, so consumers must not act on a packet before
+    done is asserted.
+
+    Parameters
+    ----------
+    address : int
+        Device address after reset.
+
+    groups : int
+        Multicast group mask after reset.
+
+    Attributes
+    ----------
+    din : octet in
+        Decoded packet octet. Valid when stb is high.
+
+    stb : in
+        High for one cycle for every decoded octet.
+
+    eop : in
+        High for one cycle at the end of a packet.
+
+    abort : in
+        High for one cycle at the end of a damaged packet.
+
+    address : in
+        Device address.
+
+    groups : in
+        Multicast group mask.
+
+    start : out
+        High for one cycle when the command octet of a packet addressed to us arrives.
+
+    cmd : octet out
+        Command of the current packet. Valid after start.
+
+    data : octet out
+        Payload octet. Valid when data_stb is high.
+
+    data_stb : out
+        High for one cycle for every payload octet of a packet addressed to us.
+
+    done : out
+        High for one cycle at the end of a packet addressed to us which passed its CRC check.
+
+    error : out
+        High for one cycle at the end of a packet addressed to us which was damaged,
+        truncated or failed its CRC check.
+    """
+    def __init__(self, address=0, groups=0):
+        self.din = Signal(8)
+        self.stb = Signal()
+        self.eop = Signal()
+        self.abort = Signal()
+
+        self.address = Signal(32, reset=address)
+        self.groups = Signal(32, reset=groups)
+
+        self.start = Signal()
+        self.cmd = Signal(8)
+        self.data = Signal(8)
+        self.data_stb = Signal()
+        self.done = Signal()
+        self.error = Signal()
+
+        ###
+
+        # the last four octets received; once the packet ends, these are its CRC
+        window = Signal(32)
+        fill = Signal(max=5)
+
+        # octets leaving the window make up the packet body
+        body = Signal(8)
+        body_stb = Signal()
+
+        # position in the body: 0-3 destination, 4 command, 5 payload
+        pos = Signal(max=6)
+
+        destination = Signal(32)
+        match = Signal()
+        matched = Signal()
+
+        self.submodules.crc = LuxCRC(8)
+
+        ###
+
+        self.comb += [
+            body.eq(window[:8]),
+            body_stb.eq(self.stb & (fill == 4)),
+
+            self.crc.data.eq(body),
+            self.crc.ce.eq(body_stb),
+            self.crc.reset.eq(self.eop | self.abort),
+
+            match.eq((destination == BROADCAST) | Mux(destination[31],
+                (destination[:31] & self.groups[:31]) != 0,
+                destination == self.address,
+            )),
+
+            self.start.eq(body_stb & (pos == 4) & match),
+            self.data.eq(body),
+            self.data_stb.eq(body_stb & (pos == 5) & matched),
+
+            self.done.eq(self.eop & ~self.abort & matched & (fill == 4) & (pos == 5) & (self.crc.value == window)),
+            self.error.eq((self.eop | self.abort) & matched & ~self.done),
+        ]
+
+        self.sync += If(self.eop | self.abort,
+            fill.eq(0),
+            pos.eq(0),
+            matched.eq(0),
+        ).Elif(self.stb,
+            window.eq(Cat(window[8:], self.din)),
+            If(fill != 4,
+                fill.eq(fill + 1),
+            ),
+
+            If(body_stb,
+                If(pos < 4,
+                    destination.eq(Cat(destination[8:], body)),
+                ),
+                If(pos == 4,
+                    self.cmd.eq(body),
+                    matched.eq(match),
+                ),
+                If(pos != 5,
+                    pos.eq(pos + 1),
+                ),
+            ),
+        )
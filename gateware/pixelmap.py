@@ -0,0 +1,215 @@
+from migen import *
+
+from .util import UncheckedMemory
+
+
+class PixelMap(Module):
+    """
+    Logical to physical pixel index table
+
+    Maps the pixel order used by the host onto the order of the LEDs on the strip, e.g. to
+    undo serpentine wiring of a matrix or reversed segments. The table starts out as the
+    identity mapping. It is loaded from a stream of little-endian 16-bit words: the index of
+    the first entry to write, followed by the entries themselves.
+
+    The table is double-buffered, so that a load only takes effect once it is known to be
+    intact. Entries are written into the inactive bank as they arrive, and `commit` makes
+    it the active one, while `discard` drops them. Either way the entries the load wrote
+    are then copied from the active bank into the inactive one in the background, giving
+    way to the next load and skipping the entries it has written already, so that both
+    banks hold the same table again.
+
+    Parameters
+    ----------
+    depth : int
+        Number of entries.
+
+    Attributes
+    ----------
+    logical : in
+        Index to look up.
+
+    physical : out
+        Table entry for logical, one cycle after logical is presented.
+
+    din : octet in
+        Load stream octet. Valid when stb is high.
+
+    stb : in
+        High for one cycle for every load stream octet.
+
+    start : in
+        Restarts the load stream.
+
+    commit : in
+        Applies the entries loaded since start.
+
+    discard : in
+        Drops the entries loaded since start.
+
+    ready : out
+        Low while a commit or discard waits for the copy after the previous one to finish,
+        which only happens when loads end less than depth cycles apart. The load stream
+        must be held off meanwhile.
+    """
+    def __init__(self, depth):
+        self.logical = Signal(max=depth)
+        self.physical = Signal(max=depth)
+
+        self.din = Signal(8)
+        self.stb = Signal()
+        self.start = Signal()
+        self.commit = Signal()
+        self.discard = Signal()
+        self.ready = Signal()
+
+        ###
+
+        index_bits = bits_for(depth - 1)
+
+        # both banks live in one memory; the top address bit selects the bank. Reads always
+        # come from the active bank, and writes go to the other one
+        identity = list(range(depth)) + [0] * ((1 << index_bits) - depth)
+        storage = UncheckedMemory(len(self.physical), 2 << index_bits, init=identity * 2)
+        wrport = storage.get_port(write_capable=True)
+        rdport = storage.get_port(mode=READ_FIRST)
+        cpport = storage.get_port(mode=READ_FIRST)
+        self.specials += storage, wrport, rdport, cpport
+
+        # the bank lookups are served from; loads go to the other one
+        active = Signal()
+
+        self.comb += [
+            rdport.adr.eq(Cat(self.logical, active)),
+            self.physical.eq(rdport.dat_r),
+        ]
+
+        # low octet of the word being received
+        low = Signal(8)
+
+        # the next octet completes a word
+        high = Signal()
+
+        # the next word is the start index rather than an entry
+        first = Signal()
+
+        # entry written by the next word
+        adr = Signal(16)
+
+        # a load has written entries lo up to adr, which are not in the active bank yet
+        loading = Signal()
+        lo = Signal(16)
+        load_we = Signal()
+
+        # a commit or discard which arrived during a copy, and waits for it to finish
+        commit_deferred = Signal()
+        discard_deferred = Signal()
+        apply = Signal()
+        drop = Signal()
+
+        # copy of the entries of the last load between the banks; each entry is written the
+        # cycle after it is read, unless the load in progress has written it already, or
+        # takes the write port that cycle, in which case it is read again
+        syncing = Signal()
+        sync_ptr = Signal(max=depth + 1)
+        sync_end = Signal(max=depth + 1)
+        issued = Signal()
+        issue = Signal()
+        fetched = Signal()
+        fetch_ptr = Signal(max=depth + 1)
+        store = Signal()
+        retry = Signal()
+
+        # end of the range written by the last load, clamped to the table
+        end = Signal(max=depth + 1)
+
+        self.sync += If(self.start,
+            high.eq(0),
+            first.eq(1),
+        ).Elif(self.stb,
+            high.eq(~high),
+            If(~high,
+                low.eq(self.din),
+            ).Elif(first,
+                adr.eq(Cat(low, self.din)),
+                lo.eq(Cat(low, self.din)),
+                first.eq(0),
+            ).Else(
+                adr.eq(adr + 1),
+            )
+        )
+
+        self.comb += [
+            load_we.eq(self.stb & high & ~first & (adr < depth)), # entries past the end are dropped
+            apply.eq((self.commit | commit_deferred) & ~syncing),
+            drop.eq((self.discard | discard_deferred) & ~syncing),
+            end.eq(Mux(adr < depth, adr, depth)),
+            self.ready.eq(~commit_deferred & ~discard_deferred),
+        ]
+
+        self.sync += [
+            If(apply,
+                active.eq(~active),
+            ),
+
+            If(apply | drop,
+                loading.eq(0),
+            ).Elif(self.stb & high & first,
+                loading.eq(1),
+            ),
+
+            If(apply,
+                commit_deferred.eq(0),
+            ).Elif(self.commit,
+                commit_deferred.eq(1),
+            ),
+            If(drop,
+                discard_deferred.eq(0),
+            ).Elif(self.discard,
+                discard_deferred.eq(1),
+            ),
+        ]
+
+        self.comb += [
+            issue.eq(syncing & ~issued & ~load_we),
+            store.eq(fetched & ~load_we & ~(loading & (fetch_ptr >= lo) & (fetch_ptr < adr))),
+            retry.eq(fetched & load_we),
+        ]
+        self.sync += [
+            If(apply | drop,
+                syncing.eq(loading & (lo < end)),
+                sync_ptr.eq(lo),
+                sync_end.eq(end),
+                issued.eq(0),
+            ).Else(
+                If(fetched & ~load_we & (fetch_ptr == sync_end - 1),
+                    syncing.eq(0),
+                ),
+
+                If(retry,
+                    sync_ptr.eq(fetch_ptr),
+                    issued.eq(0),
+                ).Elif(issue,
+                    sync_ptr.eq(sync_ptr + 1),
+                    issued.eq(sync_ptr == sync_end - 1),
+                ),
+            ),
+
+            fetched.eq(issue),
+            fetch_ptr.eq(sync_ptr),
+        ]
+
+        # after a commit the active bank has just flipped, so the copy always runs from the
+        # active bank into the other one
+        self.comb += [
+            cpport.adr.eq(Cat(sync_ptr[:index_bits], active)),
+            If(load_we,
+                wrport.adr.eq(Cat(adr[:index_bits], ~active)),
+                wrport.dat_w.eq(Cat(low, self.din)),
+                wrport.we.eq(1),
+            ).Else(
+                wrport.adr.eq(Cat(fetch_ptr[:index_bits], ~active)),
+                wrport.dat_w.eq(cpport.dat_r),
+                wrport.we.eq(store),
+            ),
+        ]
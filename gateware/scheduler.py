@@ -0,0 +1,52 @@
+from migen import *
+
+from .util import closest_divisor
+
+
+class RefreshScheduler(Module):
+    """
+    Frame refresh timebase
+
+    Produces a tick at a fixed frame rate, independent of when the host delivers frames.
+    A resync strobe (e.g. a sync packet broadcast to several boards) forces a tick and
+    restarts the timebase, so boards sharing a sync source refresh in lockstep.
+
+    Parameters
+    ----------
+    clk_freq : int
+        Base clock domain frequency.
+
+    frame_rate : int
+        Default frame rate.
+
+    Attributes
+    ----------
+    period : in
+        Clock cycles between ticks. Resets to the value for frame_rate.
+
+    external : in
+        When high, the internal timebase is disabled and ticks only follow resync.
+
+    resync : in
+        Forces a tick and restarts the timebase.
+
+    tick : out
+        High for one cycle at the start of every frame.
+    """
+    def __init__(self, clk_freq, frame_rate):
+        self.period = Signal(max=clk_freq + 1, reset=closest_divisor(clk_freq, frame_rate))
+        self.external = Signal()
+        self.resync = Signal()
+        self.tick = Signal()
+
+        ###
+
+        # counts down to 1 rather than 0, so that it can be reloaded with period as is
+        counter = Signal(len(self.period), reset=self.period.reset.value)
+
+        self.comb += self.tick.eq(self.resync | (~self.external & (counter == 1)))
+        self.sync += If(self.resync | (counter == 1),
+            counter.eq(self.period), # restart the frame period
+        ).Else(
+            counter.eq(counter - 1),
+        )
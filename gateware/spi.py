@@ -0,0 +1,103 @@
+from migen import *
+from migen.genlib.cdc import MultiReg
+from migen.genlib.fifo import AsyncFIFO
+
+
+class SPITarget(Module):
+    """
+    SPI target receive core (mode 0)
+
+    Octets are shifted in MSB first on rising edges of the SPI clock and handed to the
+    system clock domain through an asynchronous FIFO, so the SPI clock may run faster than
+    the system clock. Deasserting cs_n realigns the receiver to the next octet boundary;
+    it must stay deasserted for at least four system clock cycles between transfers.
+
+    The SPI clock is not sampled: the caller provides a clock domain driven by it.
+
+    Parameters
+    ----------
+    pads : {mosi, cs_n}
+
+    depth : int
+        Depth of the input FIFO, in octets.
+
+    clock_domain : str
+        Clock domain driven by the SPI clock.
+
+    Attributes
+    ----------
+    rx_data : octet out
+        Recieve buffer. Valid when rx_ready is high.
+
+    rx_ready : out
+        High when rx_data contains a full octet.
+
+    rx_ack : in
+        User should set high to signal that rx_data may be cleared and a new byte recieved.
+    """
+    def __init__(self, pads, depth=16, clock_domain="spi"):
+        self.rx_data = Signal(8)
+        self.rx_ready = Signal()
+        self.rx_ack = Signal()
+
+        ###
+
+        self.submodules.fifo = ClockDomainsRenamer({"write": clock_domain, "read": "sys"})(AsyncFIFO(8, depth))
+
+        self.comb += [
+            self.rx_data.eq(self.fifo.dout),
+            self.rx_ready.eq(self.fifo.readable),
+            self.fifo.re.eq(self.rx_ack),
+        ]
+
+        ### TRANSFER TRACKING (sys) ###
+
+        # cs_n brought into our domain
+        cs_n = Signal(reset=1)
+        cs_n_last = Signal(reset=1)
+
+        # toggles at the end of every transfer
+        epoch = Signal()
+
+        ###
+
+        self.specials += MultiReg(pads.cs_n, cs_n)
+        self.sync += [
+            cs_n_last.eq(cs_n),
+            If(cs_n & ~cs_n_last,
+                epoch.eq(~epoch),
+            ),
+        ]
+
+        ### SHIFTER (spi) ###
+
+        # epoch of the last transfer we clocked a bit in
+        epoch_seen = Signal()
+
+        # what bit are we on?
+        bitno = Signal(3)
+        count = Signal(3)
+
+        # the bits of this octet shifted in so far, newest first
+        shift = Signal(7)
+
+        ###
+
+        sync_spi = getattr(self.sync, clock_domain)
+
+        # epoch only changes between transfers, while the SPI clock is stopped, so it can
+        # be read here without synchronization. A new epoch means a new transfer has
+        # begun, and the first bit is the MSB of an octet.
+        self.comb += count.eq(Mux(epoch != epoch_seen, 0, bitno))
+
+        sync_spi += If(~pads.cs_n,
+            epoch_seen.eq(epoch),
+            bitno.eq(count + 1),
+            shift.eq(Cat(pads.mosi, shift[:6])),
+        )
+
+        # the last bit goes straight into the FIFO, on the same clock edge which shifts it in
+        self.comb += [
+            self.fifo.din.eq(Cat(pads.mosi, shift)),
+            self.fifo.we.eq(~pads.cs_n & (count == 7)),
+        ]
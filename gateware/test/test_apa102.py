@@ -0,0 +1,49 @@
+from unittest import TestCase
+from migen import *
+from migen.genlib.fifo import SyncFIFOBuffered
+from .util import simulation_test
+from ..apa102 import APA102Controller
+
+class _TestPads:
+    def __init__(self):
+        self.clk = Signal()
+        self.data = Signal()
+
+class APA102Testbench(Module):
+    def __init__(self):
+        self.pads = _TestPads()
+        self.submodules.fifo = SyncFIFOBuffered(24, 4)
+        self.submodules.controller = APA102Controller(self.pads, self.fifo, 12000000, freq_tx=3e6)
+
+    def capture(self, cycles):
+        bits = []
+        clk = 0
+        for _ in range(cycles):
+            last, clk = clk, (yield self.pads.clk)
+            if clk and not last:
+                bits.append((yield self.pads.data))
+            yield
+        return bits
+
+def words(bits):
+    return [int(''.join(map(str, bits[i:i+32])), 2) for i in range(0, len(bits), 32)]
+
+class APA102TestCase(TestCase):
+    def setUp(self):
+        self.tb = APA102Testbench()
+
+    @simulation_test
+    def test_frame(self, tb):
+        yield from self.tb.fifo.write(0x0000ff)
+        yield from self.tb.fifo.write(0x123456)
+        yield self.tb.controller.brightness.eq(0x10)
+        yield self.tb.controller.write_en.eq(1)
+        yield
+        yield self.tb.controller.write_en.eq(0)
+
+        bits = yield from self.tb.capture(2000)
+        self.assertEqual(words(bits), [
+            0x00000000,             # start frame
+            0xf00000ff, 0xf0123456, # brightness 0x10
+            0x00000000, 0x00000000, # end frame
+        ])
@@ -0,0 +1,116 @@
+from unittest import TestCase
+from migen import *
+from .util import simulation_test
+from ..framebuffer import Framebuffer
+from ..blend import Blender
+
+class BlenderTestbench(Module):
+    def __init__(self):
+        self.submodules.fb = Framebuffer(24, 4)
+        self.submodules.blend = Blender(self.fb, 4)
+        self.comb += [
+            self.blend.start.eq(self.fb.started),
+            self.blend.swapped.eq(self.fb.swapped),
+        ]
+
+    def write_frame(self, pixels):
+        for adr, pixel in enumerate(pixels):
+            yield self.fb.adr.eq(adr)
+            yield self.fb.din.eq(pixel)
+            yield self.fb.we.eq(1)
+            yield
+        yield self.fb.we.eq(0)
+        yield self.fb.commit.eq(1)
+        yield
+        yield self.fb.commit.eq(0)
+
+    def refresh(self):
+        yield self.fb.tick.eq(1)
+        yield
+        yield self.fb.tick.eq(0)
+        yield
+
+        # long enough for the divider and every pixel
+        pixels = []
+        for _ in range(100):
+            if (yield self.blend.readable):
+                pixels.append((yield self.blend.dout))
+                yield self.blend.re.eq(1)
+                yield
+                yield self.blend.re.eq(0)
+            yield
+        return pixels
+
+def blend(a, b, alpha):
+    # per channel, as the gateware does it
+    return sum(((x + (((y - x) * alpha) >> 8)) & 0xff) << shift
+        for shift in (0, 8, 16)
+        for x, y in [((a >> shift) & 0xff, (b >> shift) & 0xff)])
+
+class BlenderTestCase(TestCase):
+    def setUp(self):
+        self.tb = BlenderTestbench()
+
+    @simulation_test
+    def test_cut(self, tb):
+        yield from self.tb.write_frame([0x102030, 0xffffff, 0, 0x0000ff])
+        pixels = yield from self.tb.refresh()
+        self.assertEqual(pixels, [0x102030, 0xffffff, 0, 0x0000ff])
+
+        pixels = yield from self.tb.refresh()
+        self.assertEqual(pixels, [0x102030, 0xffffff, 0, 0x0000ff])
+
+    @simulation_test
+    def test_fade(self, tb):
+        a = [0x000000, 0xffffff, 0x10ff80, 0x0000ff]
+        b = [0xffffff, 0x000000, 0x80ff10, 0x0000ff]
+
+        yield from self.tb.write_frame(a)
+        pixels = yield from self.tb.refresh()
+        self.assertEqual(pixels, a)
+
+        yield self.tb.blend.steps.eq(4)
+        yield from self.tb.write_frame(b)
+        for alpha in [64, 128, 192, 256, 256]:
+            pixels = yield from self.tb.refresh()
+            self.assertEqual(pixels, [blend(x, y, alpha) for x, y in zip(a, b)])
+
+    @simulation_test
+    def test_interrupted_fade(self, tb):
+        a = [0x000000] * 4
+        b = [0xffffff] * 4
+        c = [0x000000] * 4
+        yield self.tb.blend.steps.eq(4)
+
+        yield from self.tb.write_frame(a)
+        yield from self.tb.refresh()
+        yield from self.tb.write_frame(b)
+        pixels = yield from self.tb.refresh()
+        yield from self.tb.refresh()
+        halfway = [blend(x, y, 128) for x, y in zip(a, b)]
+
+        # a new keyframe fades out from whatever is on display
+        yield from self.tb.write_frame(c)
+        pixels = yield from self.tb.refresh()
+        self.assertEqual(pixels, [blend(x, y, 64) for x, y in zip(halfway, c)])
+
+    @simulation_test
+    def test_tick_before_last_pixel(self, tb):
+        yield from self.tb.write_frame([1, 2, 3, 4])
+        yield self.tb.fb.tick.eq(1)
+        yield
+        yield self.tb.fb.tick.eq(0)
+
+        pixels = []
+        while len(pixels) < 3 or not (yield self.tb.blend.readable):
+            if (yield self.tb.blend.readable):
+                pixels.append((yield self.tb.blend.dout))
+                yield self.tb.blend.re.eq(1)
+                yield
+                yield self.tb.blend.re.eq(0)
+            yield
+
+        # the next refresh starts while the last pixel is still waiting to be read
+        yield from self.tb.write_frame([5, 6, 7, 8])
+        pixels += yield from self.tb.refresh()
+        self.assertEqual(pixels, [1, 2, 3, 4, 5, 6, 7, 8])
@@ -0,0 +1,55 @@
+from unittest import TestCase
+import os
+import tempfile
+
+from migen.build.platforms import icestick
+
+from ..build import SYNTH_OPTS, design_hash, build_variant, parse_variant, variant_name
+from ..top import TopModule
+
+class BuildCacheTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, 'cache')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def generate(self, **options):
+        build_dir = tempfile.mkdtemp(dir=self.tmp.name)
+        plat = icestick.Platform()
+        plat.build(TopModule(plat, **options), build_dir=build_dir, run=False, synth_opts=SYNTH_OPTS)
+        return design_hash(build_dir)
+
+    def test_hash(self):
+        self.assertEqual(self.generate(), self.generate())
+        self.assertNotEqual(self.generate(), self.generate(n_pixels=9))
+        self.assertNotEqual(self.generate(), self.generate(baud_rate=1000000))
+
+    def test_hit(self):
+        # the toolchain never runs on a hit, so a planted entry is enough
+        key = self.generate(n_pixels=16)
+        os.makedirs(os.path.join(self.cache_dir, key))
+        with open(os.path.join(self.cache_dir, key, 'top.bin'), 'wb') as f:
+            f.write(b'bitstream')
+
+        build_dir = os.path.join(self.tmp.name, 'build')
+        result, hit, elapsed = build_variant({'n_pixels': 16}, build_dir, self.cache_dir)
+        self.assertEqual(result, key)
+        self.assertTrue(hit)
+        with open(os.path.join(build_dir, 'top.bin'), 'rb') as f:
+            self.assertEqual(f.read(), b'bitstream')
+
+        # nothing is left behind in the cache
+        self.assertEqual(os.listdir(self.cache_dir), [key])
+
+    def test_variants(self):
+        options = parse_variant('n_pixels=0x10,led=apa102')
+        self.assertEqual(options, {'n_pixels': 16, 'led': 'apa102'})
+        self.assertEqual(variant_name(options), 'led-apa102_n_pixels-16')
+        self.assertEqual(variant_name({}), 'default')
+
+        self.assertEqual(parse_variant('rs485=False,link=spi'), {'rs485': False, 'link': 'spi'})
+        self.assertIs(parse_variant('rs485=True')['rs485'], True)
+        with self.assertRaises(ValueError):
+            parse_variant('n_pixel=300')
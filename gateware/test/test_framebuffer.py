@@ -0,0 +1,236 @@
+from unittest import TestCase
+from migen import *
+from .util import simulation_test
+from ..framebuffer import Framebuffer
+
+class FramebufferTestbench(Module):
+    def __init__(self):
+        self.submodules.fb = Framebuffer(24, 4)
+
+    def write_frame(self, pixels, commit=True):
+        for adr, pixel in enumerate(pixels):
+            while not (yield self.fb.writable):
+                yield
+            yield self.fb.adr.eq(adr)
+            yield self.fb.din.eq(pixel)
+            yield self.fb.we.eq(1)
+            yield
+        yield self.fb.we.eq(0)
+        if commit:
+            yield self.fb.commit.eq(1)
+            yield
+            yield self.fb.commit.eq(0)
+
+    def tick(self):
+        yield self.fb.tick.eq(1)
+        yield
+        yield self.fb.tick.eq(0)
+        yield
+        while not (yield self.fb.writable):
+            yield
+        yield
+
+    def scanout(self):
+        pixels = []
+        while (yield self.fb.readable):
+            pixels.append((yield self.fb.dout))
+            yield self.fb.re.eq(1)
+            yield
+            yield self.fb.re.eq(0)
+            yield
+        return pixels
+
+class FramebufferTestCase(TestCase):
+    def setUp(self):
+        self.tb = FramebufferTestbench()
+
+    @simulation_test
+    def test_swap_on_tick(self, tb):
+        yield from self.tb.write_frame([0x111111, 0x222222, 0x333333, 0x444444])
+        self.assertEqual((yield self.tb.fb.readable), 0)
+        yield from self.tb.tick()
+        pixels = yield from self.tb.scanout()
+        self.assertEqual(pixels, [0x111111, 0x222222, 0x333333, 0x444444])
+
+    @simulation_test
+    def test_repeat_without_commit(self, tb):
+        yield from self.tb.write_frame([1, 2, 3, 4])
+        yield from self.tb.tick()
+        yield from self.tb.scanout()
+
+        # an incomplete frame is never shown
+        yield from self.tb.write_frame([5, 6], commit=False)
+        yield from self.tb.tick()
+        pixels = yield from self.tb.scanout()
+        self.assertEqual(pixels, [1, 2, 3, 4])
+
+        yield from self.tb.write_frame([5, 6, 7, 8])
+        yield from self.tb.tick()
+        pixels = yield from self.tb.scanout()
+        self.assertEqual(pixels, [5, 6, 7, 8])
+
+    @simulation_test
+    def test_tick_during_scanout(self, tb):
+        yield from self.tb.write_frame([1, 2, 3, 4])
+        yield from self.tb.tick()
+        yield from self.tb.write_frame([5, 6, 7, 8])
+
+        # the second tick arrives before the first frame has been read out
+        yield from self.tb.tick()
+        pixels = yield from self.tb.scanout()
+        self.assertEqual(pixels, [1, 2, 3, 4])
+
+        yield from self.tb.tick()
+        pixels = yield from self.tb.scanout()
+        self.assertEqual(pixels, [5, 6, 7, 8])
+
+    @simulation_test
+    def test_back_to_back(self, tb):
+        # the host streams frames without pause, so every tick lands while the next frame
+        # is being written
+        frames = [[n * 0x10 + i for i in range(4)] for n in range(5)]
+        yield from self.tb.write_frame(frames[0])
+        for shown, written in zip(frames, frames[1:]):
+            yield from self.tb.write_frame(written[:2], commit=False)
+            yield from self.tb.tick()
+            pixels = yield from self.tb.scanout()
+            self.assertEqual(pixels, shown)
+            yield from self.tb.write_frame(written)
+
+    @simulation_test
+    def test_superseded(self, tb):
+        # a frame committed after another which was not displayed yet replaces it
+        yield from self.tb.write_frame([1, 2, 3, 4])
+        yield from self.tb.write_frame([5, 6, 7, 8])
+
+        # the second commit came before the copy of the first one finished
+        yield
+        self.assertEqual((yield self.tb.fb.writable), 0)
+        while not (yield self.tb.fb.writable):
+            yield
+
+        yield from self.tb.tick()
+        pixels = yield from self.tb.scanout()
+        self.assertEqual(pixels, [5, 6, 7, 8])
+
+    @simulation_test
+    def test_write_during_copy(self, tb):
+        yield from self.tb.write_frame([1, 2, 3, 4])
+
+        # the copy of the committed frame runs behind the writer without holding it off,
+        # and does not overwrite what it writes
+        self.assertEqual((yield self.tb.fb.writable), 1)
+        yield from self.tb.write_frame([9], commit=False)
+        yield self.tb.fb.adr.eq(3)
+        yield self.tb.fb.din.eq(8)
+        yield self.tb.fb.we.eq(1)
+        yield
+        yield self.tb.fb.we.eq(0)
+        for _ in range(8):
+            self.assertEqual((yield self.tb.fb.writable), 1)
+            yield
+
+        yield self.tb.fb.commit.eq(1)
+        yield
+        yield self.tb.fb.commit.eq(0)
+        yield from self.tb.tick()
+        pixels = yield from self.tb.scanout()
+        self.assertEqual(pixels, [9, 2, 3, 8])
+
+    @simulation_test
+    def test_length(self, tb):
+        yield self.tb.fb.length.eq(2)
+        yield from self.tb.write_frame([1, 2, 3, 4])
+        yield from self.tb.tick()
+        pixels = yield from self.tb.scanout()
+        self.assertEqual(pixels, [1, 2])
+
+    @simulation_test
+    def test_partial_update(self, tb):
+        yield from self.tb.write_frame([1, 2, 3, 4])
+        yield from self.tb.tick()
+        yield from self.tb.scanout()
+
+        # the back buffer was refreshed from the front buffer, so a partial write keeps
+        # the rest of the displayed frame
+        yield self.tb.fb.adr.eq(2)
+        yield self.tb.fb.din.eq(7)
+        yield self.tb.fb.we.eq(1)
+        yield
+        yield self.tb.fb.we.eq(0)
+        yield self.tb.fb.commit.eq(1)
+        yield
+        yield self.tb.fb.commit.eq(0)
+        yield from self.tb.tick()
+        pixels = yield from self.tb.scanout()
+        self.assertEqual(pixels, [1, 2, 7, 4])
+
+        yield from self.tb.write_frame([8], commit=True)
+        yield from self.tb.tick()
+        pixels = yield from self.tb.scanout()
+        self.assertEqual(pixels, [8, 2, 7, 4])
+
+    @simulation_test
+    def test_discard(self, tb):
+        yield from self.tb.write_frame([1, 2, 3, 4])
+        yield from self.tb.tick()
+        yield from self.tb.scanout()
+
+        # a discard rolls back the writes since the last commit, and the writer carries on
+        yield from self.tb.write_frame([5, 6, 7], commit=False)
+        yield self.tb.fb.discard.eq(1)
+        yield
+        yield self.tb.fb.discard.eq(0)
+        yield
+        self.assertEqual((yield self.tb.fb.writable), 1)
+
+        # another one before that copy has finished holds the writer off for a full copy
+        yield from self.tb.write_frame([9], commit=False)
+        yield self.tb.fb.discard.eq(1)
+        yield
+        yield self.tb.fb.discard.eq(0)
+        yield
+        self.assertEqual((yield self.tb.fb.writable), 0)
+
+        while not (yield self.tb.fb.writable):
+            yield
+        yield self.tb.fb.adr.eq(3)
+        yield self.tb.fb.din.eq(8)
+        yield self.tb.fb.we.eq(1)
+        yield
+        yield self.tb.fb.we.eq(0)
+        yield self.tb.fb.commit.eq(1)
+        yield
+        yield self.tb.fb.commit.eq(0)
+        yield
+        while not (yield self.tb.fb.writable):
+            yield
+        yield from self.tb.tick()
+        pixels = yield from self.tb.scanout()
+        self.assertEqual(pixels, [1, 2, 3, 8])
+
+    @simulation_test
+    def test_copy_during_fast_scanout(self, tb):
+        # the scanout takes the read port on every cycle it reads a pixel, and the copy
+        # makes progress in between
+        yield from self.tb.write_frame([1, 2, 3, 4])
+        yield self.tb.fb.tick.eq(1)
+        yield
+        yield self.tb.fb.tick.eq(0)
+        yield
+        yield self.tb.fb.re.eq(1)
+        yield
+        pixels = []
+        while (yield self.tb.fb.readable):
+            pixels.append((yield self.tb.fb.dout))
+            yield
+        yield self.tb.fb.re.eq(0)
+        self.assertEqual(pixels, [1, 2, 3, 4])
+
+        yield from self.tb.write_frame([5])
+        yield
+        while not (yield self.tb.fb.writable):
+            yield
+        yield from self.tb.tick()
+        pixels = yield from self.tb.scanout()
+        self.assertEqual(pixels, [5, 2, 3, 4])
@@ -0,0 +1,76 @@
+from unittest import TestCase
+from migen import *
+from .util import simulation_test
+from ..cobs import COBS
+from ..lux import LuxReceiver, BROADCAST, CMD_FRAME, CMD_SYNC
+from host.lux import packet, multicast
+
+class LuxTestbench(Module):
+    def __init__(self):
+        self.submodules.cobs = COBS()
+        self.submodules.lux = LuxReceiver(address=0x1234, groups=0b0110)
+        self.comb += [
+            self.lux.din.eq(self.cobs.dout),
+            self.lux.stb.eq(self.cobs.outrdy),
+            self.lux.eop.eq(self.cobs.eop),
+            self.lux.abort.eq(self.cobs.error),
+        ]
+
+    def receive(self, data):
+        payload = []
+        events = []
+        for b in data:
+            yield self.cobs.din.eq(b)
+            yield self.cobs.inclk.eq(1)
+            yield
+            yield self.cobs.inclk.eq(0)
+            for _ in range(3):
+                if (yield self.lux.data_stb):
+                    payload.append((yield self.lux.data))
+                if (yield self.lux.done):
+                    events.append(('done', (yield self.lux.cmd), bytes(payload)))
+                    payload = []
+                if (yield self.lux.error):
+                    events.append(('error',))
+                    payload = []
+                yield
+        return events
+
+class LuxTestCase(TestCase):
+    def setUp(self):
+        self.tb = LuxTestbench()
+
+    @simulation_test
+    def test_unicast(self, tb):
+        events = yield from self.tb.receive(packet(0x1234, CMD_FRAME, b'\x01\x00\x02\xff'))
+        self.assertEqual(events, [('done', CMD_FRAME, b'\x01\x00\x02\xff')])
+
+    @simulation_test
+    def test_other_address(self, tb):
+        events = yield from self.tb.receive(packet(0x1235, CMD_FRAME, b'\x01\x02\x03'))
+        self.assertEqual(events, [])
+
+    @simulation_test
+    def test_broadcast(self, tb):
+        events = yield from self.tb.receive(packet(BROADCAST, CMD_SYNC))
+        self.assertEqual(events, [('done', CMD_SYNC, b'')])
+
+    @simulation_test
+    def test_multicast(self, tb):
+        events = yield from self.tb.receive(
+            packet(multicast(0b0100), CMD_SYNC) +
+            packet(multicast(0b1001), CMD_SYNC)
+        )
+        self.assertEqual(events, [('done', CMD_SYNC, b'')])
+
+    @simulation_test
+    def test_bad_crc(self, tb):
+        data = bytearray(packet(0x1234, CMD_FRAME, b'\x01\x02\x03'))
+        data[-3] ^= 0x01
+        events = yield from self.tb.receive(data + packet(0x1234, CMD_SYNC))
+        self.assertEqual(events, [('error',), ('done', CMD_SYNC, b'')])
+
+    @simulation_test
+    def test_resync_after_garbage(self, tb):
+        events = yield from self.tb.receive(b'\x05\x01\x02\x00' + packet(BROADCAST, CMD_FRAME, b'\x00' * 300))
+        self.assertEqual(events, [('done', CMD_FRAME, b'\x00' * 300)])
@@ -0,0 +1,117 @@
+from unittest import TestCase
+from migen import *
+from .util import simulation_test
+from ..pixelmap import PixelMap
+from host.lux import map_payload, serpentine
+
+class PixelMapTestbench(Module):
+    def __init__(self, depth=8):
+        self.depth = depth
+        self.submodules.pixelmap = PixelMap(depth)
+
+    def load(self, data, commit=True):
+        yield self.pixelmap.start.eq(1)
+        yield
+        yield self.pixelmap.start.eq(0)
+        for b in data:
+            yield self.pixelmap.din.eq(b)
+            yield self.pixelmap.stb.eq(1)
+            yield
+            yield self.pixelmap.stb.eq(0)
+            yield
+
+        # the packet ends, and takes effect only if it passed its CRC check
+        end = self.pixelmap.commit if commit else self.pixelmap.discard
+        while not (yield self.pixelmap.ready):
+            yield
+        yield end.eq(1)
+        yield
+        yield end.eq(0)
+        yield
+
+    def lookup(self):
+        entries = []
+        for i in range(self.depth):
+            yield self.pixelmap.logical.eq(i)
+            yield
+            yield
+            entries.append((yield self.pixelmap.physical))
+        return entries
+
+class PixelMapTestCase(TestCase):
+    def setUp(self):
+        self.tb = PixelMapTestbench()
+
+    @simulation_test
+    def test_identity(self, tb):
+        entries = yield from self.tb.lookup()
+        self.assertEqual(entries, list(range(8)))
+
+    @simulation_test
+    def test_serpentine(self, tb):
+        yield from self.tb.load(map_payload(serpentine(4, 2)))
+        entries = yield from self.tb.lookup()
+        self.assertEqual(entries, [0, 1, 2, 3, 7, 6, 5, 4])
+
+    @simulation_test
+    def test_partial(self, tb):
+        yield from self.tb.load(map_payload([7, 6, 5, 4, 3, 2], start=6))
+        entries = yield from self.tb.lookup()
+        self.assertEqual(entries, [0, 1, 2, 3, 4, 5, 7, 6])
+
+    @simulation_test
+    def test_bad_crc(self, tb):
+        yield from self.tb.load(map_payload([7, 6, 5, 4], start=2))
+        yield from self.tb.load(map_payload([1, 1, 1, 1, 1, 1, 1, 1]), commit=False)
+        entries = yield from self.tb.lookup()
+        self.assertEqual(entries, [0, 1, 7, 6, 5, 4, 6, 7])
+
+        # the dropped entries do not come back with a later load either
+        yield from self.tb.load(map_payload([3], start=7))
+        entries = yield from self.tb.lookup()
+        self.assertEqual(entries, [0, 1, 7, 6, 5, 4, 6, 3])
+
+    @simulation_test
+    def test_back_to_back(self, tb):
+        # loads follow each other before the banks have been brought in step
+        yield from self.tb.load(map_payload([7, 6, 5, 4, 3, 2, 1, 0]))
+        yield from self.tb.load(map_payload([1, 1], start=3), commit=False)
+        yield from self.tb.load(map_payload([2, 2], start=4))
+        yield from self.tb.load(map_payload([3], start=0), commit=False)
+        entries = yield from self.tb.lookup()
+        self.assertEqual(entries, [7, 6, 5, 4, 2, 2, 1, 0])
+
+    @simulation_test
+    def test_deferred(self, tb):
+        # a load ending while the previous one is still being copied has to wait for it
+        yield from self.tb.load(map_payload([7, 6, 5, 4, 3, 2, 1, 0]))
+        yield self.tb.pixelmap.start.eq(1)
+        yield
+        yield self.tb.pixelmap.start.eq(0)
+        for b in map_payload([5], start=1):
+            yield self.tb.pixelmap.din.eq(b)
+            yield self.tb.pixelmap.stb.eq(1)
+            yield
+        yield self.tb.pixelmap.stb.eq(0)
+        yield self.tb.pixelmap.commit.eq(1)
+        yield
+        yield self.tb.pixelmap.commit.eq(0)
+        yield
+        self.assertEqual((yield self.tb.pixelmap.ready), 0)
+        while not (yield self.tb.pixelmap.ready):
+            yield
+        entries = yield from self.tb.lookup()
+        self.assertEqual(entries, [7, 5, 5, 4, 3, 2, 1, 0])
+
+
+class PixelMapCopyTestCase(TestCase):
+    def setUp(self):
+        self.tb = PixelMapTestbench(32)
+
+    @simulation_test
+    def test_load_during_copy(self, tb):
+        # the next load writes entries the copy has not reached yet, and keeps them
+        yield from self.tb.load(map_payload(list(reversed(range(32)))))
+        yield from self.tb.load(map_payload([0, 1, 2], start=20))
+        entries = yield from self.tb.lookup()
+        self.assertEqual(entries, list(reversed(range(12, 32))) + [0, 1, 2] + list(reversed(range(9))))
@@ -0,0 +1,50 @@
+from unittest import TestCase
+from migen import *
+from .util import simulation_test
+from ..scheduler import RefreshScheduler
+
+class SchedulerTestbench(Module):
+    def __init__(self):
+        self.submodules.scheduler = RefreshScheduler(clk_freq=1000, frame_rate=100)
+
+    def tick_times(self, cycles):
+        times = []
+        for cycle in range(cycles):
+            if (yield self.scheduler.tick):
+                times.append(cycle)
+            yield
+        return times
+
+class SchedulerTestCase(TestCase):
+    def setUp(self):
+        self.tb = SchedulerTestbench()
+
+    @simulation_test
+    def test_fixed_rate(self, tb):
+        times = yield from self.tb.tick_times(45)
+        self.assertEqual([b - a for a, b in zip(times, times[1:])], [10, 10, 10])
+
+    @simulation_test
+    def test_period(self, tb):
+        yield self.tb.scheduler.period.eq(4)
+        yield
+        yield
+        times = yield from self.tb.tick_times(20)
+        self.assertEqual([b - a for a, b in zip(times, times[1:])], [4] * (len(times) - 1))
+
+    @simulation_test
+    def test_resync(self, tb):
+        for _ in range(3):
+            yield
+        yield self.tb.scheduler.resync.eq(1)
+        yield
+        yield self.tb.scheduler.resync.eq(0)
+        times = yield from self.tb.tick_times(25)
+        self.assertEqual(times, [0, 10, 20])
+
+    @simulation_test
+    def test_external(self, tb):
+        yield self.tb.scheduler.external.eq(1)
+        yield
+        times = yield from self.tb.tick_times(30)
+        self.assertEqual(times, [])
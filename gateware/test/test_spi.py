@@ -0,0 +1,56 @@
+from migen import *
+from ..spi import SPITarget
+
+class _TestPads:
+    mosi = Signal()
+    cs_n = Signal(reset=1)
+
+def _spi_send(pads, octets, idle=16):
+    def deselect():
+        yield pads.cs_n.eq(1)
+        for _ in range(idle): yield
+
+    def send_bits(bits):
+        for bit in bits:
+            yield pads.mosi.eq(bit)
+            yield
+
+    def transfer(data):
+        yield pads.cs_n.eq(0)
+        for octet in data:
+            yield from send_bits([(octet >> i) & 1 for i in reversed(range(8))])
+        yield from deselect()
+
+    yield from deselect()
+
+    # back to back octets in one transfer
+    yield from transfer(octets)
+
+    # an aborted transfer is discarded at the next octet boundary
+    yield pads.cs_n.eq(0)
+    yield from send_bits([1, 0, 1])
+    yield from deselect()
+    yield from transfer([0xa5])
+
+def _sys_receive(dut, received):
+    for _ in range(400):
+        if (yield dut.rx_ready):
+            received.append((yield dut.rx_data))
+            yield dut.rx_ack.eq(1)
+            yield
+            yield dut.rx_ack.eq(0)
+        yield
+
+def test_spi():
+    pads = _TestPads()
+    dut = SPITarget(pads)
+    octets = [0x01, 0x80, 0x55, 0xff, 0x00, 0x3c, 0xc3, 0x7e]
+    received = []
+
+    # the SPI clock runs three times faster than the system clock
+    run_simulation(dut, {
+        "sys": _sys_receive(dut, received),
+        "spi": _spi_send(pads, octets),
+    }, clocks={"sys": 30, "spi": 10}, vcd_name="spi.vcd")
+
+    assert received == octets + [0xa5]
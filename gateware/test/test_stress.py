@@ -0,0 +1,675 @@
+"""
+Constrained-random stress tests of the receive path at line rate.
+
+Long random streams are pushed back-to-back through the UART, the COBS decoder, the Lux
+receiver and the Restrider, with baud rate skew, glitches, framing errors and damaged
+packets injected, and the results are checked against host reference models. Run as a
+script to print the measured limits of each block:
+
+    python -m gateware.test.test_stress [--seed N]
+"""
+import argparse
+import random
+from unittest import TestCase
+from migen import *
+
+from host.lux import cobs_encode, cobs_decode, packet, multicast, matches, BROADCAST
+from ..uart import UART
+from ..cobs import COBS
+from ..lux import LuxReceiver
+from ..restrider import Restrider
+
+
+SEED = 0x10c5
+
+# clock cycles per UART bit; small, to keep the simulations short
+CYCLES_PER_BIT = 16
+
+# faults injected to measure how long each block takes to recover
+RECOVERY_TRIALS = 20
+
+
+### UART ###
+
+class _UARTPads:
+    def __init__(self):
+        self.tx = Signal()
+        self.rx = Signal(reset=1)
+
+def uart_line(octets, skew=0.0, gaps=None, bad_stop=(), glitches=()):
+    """
+    Line levels, one per clock cycle, of a transmitter sending octets with a bit period
+    skew (a fraction) off nominal and gaps idle bits before each octet. Octets whose
+    index is in bad_stop are sent with a low stop bit, and the line is inverted for each
+    (cycle, length) in glitches.
+
+    Returns the levels and the cycle at which each frame ends.
+    """
+    period = CYCLES_PER_BIT * (1 + skew)
+    gaps = gaps or [0] * len(octets)
+
+    bits = [1, 1]
+    ends = []
+    for index, (octet, gap) in enumerate(zip(octets, gaps)):
+        bits += [1] * gap
+        bits += [0] + [(octet >> n) & 1 for n in range(8)] + [0 if index in bad_stop else 1]
+        ends.append(round(len(bits) * period))
+    bits += [1] * 12
+
+    levels = [bits[int(cycle / period)] for cycle in range(int(len(bits) * period))]
+    for cycle, length in glitches:
+        for c in range(cycle, min(cycle + length, len(levels))):
+            levels[c] ^= 1
+    return levels, ends
+
+def run_uart(levels):
+    """
+    Plays levels into a UART receiver which is read as soon as it is ready. Returns the
+    (cycle, octet) of every octet received and the cycles at which rx_error rose.
+    """
+    pads = _UARTPads()
+    dut = UART(pads, clk_freq=CYCLES_PER_BIT, baud_rate=1)
+    received = []
+    errors = []
+
+    def drive():
+        for level in levels:
+            yield pads.rx.eq(level)
+            yield
+
+    def collect():
+        acked = error = False
+        for cycle in range(len(levels)):
+            if (yield dut.rx_ready) and not acked:
+                received.append((cycle, (yield dut.rx_data)))
+                yield dut.rx_ack.eq(1)
+                acked = True
+            else:
+                yield dut.rx_ack.eq(0)
+                acked = False
+            last, error = error, (yield dut.rx_error)
+            if error and not last:
+                errors.append(cycle)
+            yield
+
+    run_simulation(dut, [drive(), collect()])
+    return received, errors
+
+def uart_matches(octets, ends, received):
+    """
+    Which octets were received intact, within a bit of the end of their frame.
+    """
+    correct = [False] * len(octets)
+    for cycle, octet in received:
+        for index, end in enumerate(ends):
+            if abs(cycle - end) <= CYCLES_PER_BIT and octets[index] == octet:
+                correct[index] = True
+    return correct
+
+def uart_recovery(correct, faults):
+    """
+    Number of octets lost after each fault before reception resumes.
+    """
+    latencies = []
+    for fault in faults:
+        following = correct[fault + 1:]
+        latencies.append(following.index(True) if True in following else len(following))
+    return latencies
+
+
+### COBS ###
+
+def random_packet(rng, max_length=600):
+    """
+    A packet with a random length and density of zeros, favouring the edge cases of
+    COBS: no zeros at all, long runs that need 255-octet blocks, and all zeros.
+    """
+    length = rng.choice([0, 1, 253, 254, 255, 508, rng.randrange(max_length)])
+    density = rng.choice([0.0, 0.001, 0.05, 0.5, 1.0])
+    return bytes(0 if rng.random() < density else rng.randrange(1, 256) for _ in range(length))
+
+def cobs_model(stream):
+    """
+    Reference behaviour of the decoder: every delimited packet, decoded, or None if the
+    decoder must flag it as damaged.
+    """
+    packets = []
+    for encoded in stream.split(b'\0')[:-1]:
+        try:
+            packets.append(cobs_decode(encoded))
+        except ValueError:
+            packets.append(None)
+    return packets
+
+def run_cobs(stream, gap=0):
+    """
+    Feeds stream into a COBS decoder, one octet every gap+1 cycles. Returns every packet
+    decoded, or None for those flagged as damaged.
+    """
+    dut = COBS()
+    packets = []
+
+    def drive():
+        for octet in stream:
+            yield dut.din.eq(octet)
+            yield dut.inclk.eq(1)
+            yield
+            yield dut.inclk.eq(0)
+            for _ in range(gap):
+                yield
+        yield
+
+    def collect():
+        # like LuxReceiver, which drops an octet arriving together with eop
+        packet = bytearray()
+        for _ in range(len(stream) * (gap + 1) + 2):
+            if (yield dut.eop):
+                packets.append(None if (yield dut.error) else bytes(packet))
+                packet = bytearray()
+            elif (yield dut.outrdy):
+                packet.append((yield dut.dout))
+            yield
+
+    run_simulation(dut, [drive(), collect()])
+    return packets
+
+
+### LUX ###
+
+ADDRESS = 0x1234
+GROUPS = 0b0110
+
+def random_lux(rng):
+    """
+    A Lux packet to us, to another board, broadcast or multicast, with its payload or CRC
+    sometimes damaged. Returns the packet and the events LuxReceiver must produce for it.
+    """
+    destination = rng.choice([ADDRESS, ADDRESS + 1, BROADCAST, multicast(0b0100), multicast(0b1001)])
+    command = rng.randrange(256)
+    payload = bytes(rng.choice([0, rng.randrange(1, 256)]) for _ in range(rng.randrange(48)))
+
+    body = bytearray(cobs_decode(packet(destination, command, payload)[:-1]))
+    damaged = rng.random() < 0.2
+    if damaged:
+        body[rng.randrange(5, len(body))] ^= 1 << rng.randrange(8)
+    data = cobs_encode(bytes(body)) + b'\0'
+
+    if not matches(destination, ADDRESS, GROUPS):
+        return data, []
+    return data, [('error',)] if damaged else [('done', command, payload)]
+
+def run_lux(stream, gap=0):
+    """
+    Feeds stream through a COBS decoder into a LuxReceiver, one octet every gap+1 cycles.
+    Returns the events of every packet addressed to us.
+    """
+    cobs = COBS()
+    lux = LuxReceiver(address=ADDRESS, groups=GROUPS)
+    dut = Module()
+    dut.submodules += cobs, lux
+    dut.comb += [
+        lux.din.eq(cobs.dout),
+        lux.stb.eq(cobs.outrdy),
+        lux.eop.eq(cobs.eop),
+        lux.abort.eq(cobs.error),
+    ]
+    events = []
+
+    def drive():
+        for octet in stream:
+            yield cobs.din.eq(octet)
+            yield cobs.inclk.eq(1)
+            yield
+            yield cobs.inclk.eq(0)
+            for _ in range(gap):
+                yield
+        yield
+
+    def collect():
+        payload = bytearray()
+        for _ in range(len(stream) * (gap + 1) + 3):
+            if (yield lux.data_stb):
+                payload.append((yield lux.data))
+            if (yield lux.start):
+                payload = bytearray()
+            if (yield lux.done):
+                events.append(('done', (yield lux.cmd), bytes(payload)))
+            if (yield lux.error):
+                events.append(('error',))
+            yield
+
+    run_simulation(dut, [drive(), collect()])
+    return events
+
+
+### RESTRIDER ###
+
+def run_restrider(stream, rng, gap_weights=(1,)):
+    """
+    Latches stream, a list of octets and None for a reset, into a Restrider with random
+    gaps drawn from gap_weights, while a consumer shaped like TopModule's pixel writer
+    takes each word. Returns the words taken.
+    """
+    dut = ResetInserter()(Restrider())
+    words = []
+    schedule = [(item, rng.choices(range(len(gap_weights)), gap_weights)[0]) for item in stream]
+
+    def drive():
+        for item, gap in schedule:
+            if item is None:
+                yield dut.reset.eq(1)
+            else:
+                yield dut.data_in.eq(item)
+                yield dut.latch_data.eq(1)
+            yield
+            yield dut.reset.eq(0)
+            yield dut.latch_data.eq(0)
+            for _ in range(gap):
+                yield
+        yield
+
+    def consume():
+        # takes a word, then spends a cycle writing it, like the IDLE and CHUNK states
+        busy = False
+        for _ in range(sum(gap + 1 for _, gap in schedule) + 2):
+            if busy:
+                yield dut.out_read_ack.eq(0)
+                busy = False
+            elif (yield dut.done):
+                words.append((yield dut.data_out))
+                yield dut.out_read_ack.eq(1)
+                busy = True
+            yield
+
+    run_simulation(dut, [drive(), consume()])
+    return words
+
+def restrider_model(stream):
+    words = []
+    word = []
+    for item in stream:
+        if item is None:
+            word = []
+            continue
+        word.append(item)
+        if len(word) == 3:
+            words.append((word[0] << 16) | (word[1] << 8) | word[2])
+            word = []
+    return words
+
+
+### RECOVERY ###
+
+def damage(rng, encoded):
+    """
+    An encoded packet, without its delimiter, cut short, replaced with garbage or with a bit
+    flipped, any of which may also leave stray delimiters in it.
+    """
+    kind = rng.choice(['truncated', 'garbage', 'flipped'])
+    if kind == 'truncated':
+        return encoded[:rng.randrange(len(encoded) + 1)]
+    if kind == 'garbage':
+        return bytes(rng.randrange(256) for _ in range(rng.randrange(20)))
+    flipped = bytearray(encoded)
+    flipped[rng.randrange(len(flipped))] ^= 1 << rng.randrange(8)
+    return bytes(flipped)
+
+def cobs_recovery(before, after):
+    """
+    Clocks from the last delimiter of before, an encoded stream, until the decoder puts out
+    the first octet of after, the packet sent right behind it, with an octet on every clock.
+    None if after does not come out intact.
+    """
+    stream = before + cobs_encode(after) + b'\0'
+    dut = COBS()
+    out = []
+
+    def drive():
+        for octet in stream:
+            yield dut.din.eq(octet)
+            yield dut.inclk.eq(1)
+            yield
+        yield dut.inclk.eq(0)
+        yield
+
+    def collect():
+        for cycle in range(len(stream) + 2):
+            if (yield dut.eop):
+                out.append((cycle, 'error' if (yield dut.error) else 'eop'))
+            elif (yield dut.outrdy):
+                out.append((cycle, (yield dut.dout)))
+            yield
+
+    run_simulation(dut, [drive(), collect()])
+    tail = out[-len(after) - 1:]
+    if [octet for _, octet in tail] != list(after) + ['eop']:
+        return None
+    return tail[0][0] - (len(before) - 1)
+
+def lux_recovery(before, payload):
+    """
+    Clocks from the last delimiter of before, an encoded stream, until the receiver puts out
+    the first payload octet of a packet to us sent right behind it, with an octet on every
+    clock. None if that packet is not received intact.
+    """
+    stream = before + packet(ADDRESS, 0x42, payload)
+    cobs = COBS()
+    lux = LuxReceiver(address=ADDRESS, groups=GROUPS)
+    dut = Module()
+    dut.submodules += cobs, lux
+    dut.comb += [
+        lux.din.eq(cobs.dout),
+        lux.stb.eq(cobs.outrdy),
+        lux.eop.eq(cobs.eop),
+        lux.abort.eq(cobs.error),
+    ]
+    received = []
+    first = None
+    done = False
+
+    def drive():
+        for octet in stream:
+            yield cobs.din.eq(octet)
+            yield cobs.inclk.eq(1)
+            yield
+        yield cobs.inclk.eq(0)
+        yield
+
+    def collect():
+        nonlocal first, done
+        for cycle in range(len(stream) + 3):
+            if (yield lux.data_stb):
+                if not received:
+                    first = cycle
+                received.append((yield lux.data))
+            if (yield lux.start):
+                received.clear()
+            if (yield lux.done) or (yield lux.error):
+                done = (yield lux.done) and (yield lux.cmd) == 0x42 and bytes(received) == payload
+            yield
+
+    run_simulation(dut, [drive(), collect()])
+    if not done:
+        return None
+    return first - (len(before) - 1)
+
+def restrider_recovery(before, after):
+    """
+    Clocks from a reset, which follows the octets before, until the Restrider puts out the
+    first word of the octets after, with an octet on every clock. None if the words of after
+    are not put out intact.
+    """
+    stream = list(before) + [None] + list(after)
+    dut = ResetInserter()(Restrider())
+    words = []
+
+    def drive():
+        for item in stream:
+            if item is None:
+                yield dut.reset.eq(1)
+            else:
+                yield dut.data_in.eq(item)
+                yield dut.latch_data.eq(1)
+            yield
+            yield dut.reset.eq(0)
+            yield dut.latch_data.eq(0)
+        yield
+
+    def consume():
+        # takes every word at once, so that each is seen the clock it is done
+        for cycle in range(len(stream) + 2):
+            if (yield dut.done) and not (yield dut.out_read_ack):
+                words.append((cycle, (yield dut.data_out)))
+                yield dut.out_read_ack.eq(1)
+            else:
+                yield dut.out_read_ack.eq(0)
+            yield
+
+    run_simulation(dut, [drive(), consume()])
+    tail = words[-(len(after) // 3):]
+    if [word for _, word in tail] != restrider_model(after):
+        return None
+    return tail[0][0] - len(before)
+
+
+class UARTStressTestCase(TestCase):
+    def setUp(self):
+        self.rng = random.Random(SEED)
+        self.octets = [self.rng.randrange(256) for _ in range(60)]
+
+    def test_back_to_back(self):
+        levels, ends = uart_line(self.octets)
+        received, errors = run_uart(levels)
+        self.assertEqual([octet for _, octet in received], self.octets)
+        self.assertEqual(errors, [])
+
+        # the receiver keeps up with the line: one octet per frame
+        self.assertLessEqual(received[-1][0] - received[0][0], 10 * CYCLES_PER_BIT * (len(self.octets) - 1))
+
+    def test_skew(self):
+        for skew in [-0.04, 0.04]:
+            with self.subTest(skew=skew):
+                levels, ends = uart_line(self.octets, skew)
+                received, errors = run_uart(levels)
+                self.assertEqual([octet for _, octet in received], self.octets)
+                self.assertEqual(errors, [])
+
+    def test_glitches(self):
+        # glitches shorter than half a bit, on the idle line between frames
+        gaps = [self.rng.choice([0, 3]) for _ in self.octets]
+        _, ends = uart_line(self.octets, gaps=gaps)
+        glitches = [
+            (end + CYCLES_PER_BIT + self.rng.randrange(CYCLES_PER_BIT), self.rng.randrange(1, CYCLES_PER_BIT // 2))
+            for end, gap in zip([0] + ends, gaps + [0]) if gap
+        ]
+        levels, ends = uart_line(self.octets, gaps=gaps, glitches=glitches)
+        received, errors = run_uart(levels)
+        self.assertEqual([octet for _, octet in received], self.octets)
+        self.assertEqual(errors, [])
+
+    def test_framing_errors(self):
+        faults = sorted(self.rng.sample(range(len(self.octets) - 10), 4))
+
+        # an idle bit after a framing error is enough to recover straight away
+        gaps = [1] * len(self.octets)
+        levels, ends = uart_line(self.octets, gaps=gaps, bad_stop=faults)
+        received, errors = run_uart(levels)
+        correct = uart_matches(self.octets, ends, received)
+        self.assertEqual(len(errors), len(faults))
+        self.assertEqual(uart_recovery(correct, faults), [0] * len(faults))
+        self.assertEqual(sum(correct), len(self.octets) - len(faults))
+
+        # back-to-back, the receiver has to find the frame boundaries again
+        levels, ends = uart_line(self.octets, bad_stop=faults)
+        received, errors = run_uart(levels)
+        correct = uart_matches(self.octets, ends, received)
+        self.assertLessEqual(max(uart_recovery(correct, faults)), 8)
+        self.assertTrue(all(correct[-5:]))
+
+
+class COBSStressTestCase(TestCase):
+    def setUp(self):
+        self.rng = random.Random(SEED)
+
+    def test_line_rate(self):
+        packets = [random_packet(self.rng) for _ in range(40)]
+        stream = b''.join(cobs_encode(packet) + b'\0' for packet in packets)
+        self.assertEqual(run_cobs(stream), packets)
+
+    def test_damaged(self):
+        # valid packets, truncated ones, and runs of garbage, with octets on every cycle
+        stream = bytearray()
+        for _ in range(60):
+            encoded = cobs_encode(random_packet(self.rng, 300))
+            kind = self.rng.choice(['valid', 'truncated', 'garbage'])
+            if kind == 'truncated':
+                encoded = encoded[:self.rng.randrange(len(encoded) + 1)]
+            elif kind == 'garbage':
+                encoded = bytes(self.rng.randrange(256) for _ in range(self.rng.randrange(20)))
+            stream += encoded + b'\0'
+
+        expected = cobs_model(bytes(stream))
+        self.assertEqual(run_cobs(bytes(stream)), expected)
+
+        # damage is contained in the packet it occurs in
+        self.assertIn(None, expected)
+
+    def test_recovery(self):
+        # the packet right behind a damaged one comes out as soon as after an intact one
+        for _ in range(10):
+            encoded = cobs_encode(random_packet(self.rng, 100))
+            after = bytes(self.rng.randrange(256) for _ in range(1 + self.rng.randrange(20)))
+            latency = cobs_recovery(encoded + b'\0', after)
+            self.assertIsNotNone(latency)
+            self.assertEqual(cobs_recovery(damage(self.rng, encoded) + b'\0', after), latency)
+
+
+class LuxStressTestCase(TestCase):
+    def setUp(self):
+        self.rng = random.Random(SEED)
+
+    def test_line_rate(self):
+        stream = bytearray()
+        expected = []
+        for _ in range(40):
+            data, events = random_lux(self.rng)
+            stream += data
+            expected += events
+        self.assertEqual(run_lux(bytes(stream)), expected)
+        self.assertIn(('error',), expected)
+
+    def test_recovery(self):
+        # the packet right behind a damaged one is received as soon as after an intact one
+        for _ in range(10):
+            data, _ = random_lux(self.rng)
+            payload = bytes(self.rng.randrange(256) for _ in range(1 + self.rng.randrange(20)))
+            latency = lux_recovery(data, payload)
+            self.assertIsNotNone(latency)
+            self.assertEqual(lux_recovery(damage(self.rng, data[:-1]) + b'\0', payload), latency)
+
+
+class RestriderStressTestCase(TestCase):
+    def setUp(self):
+        self.rng = random.Random(SEED)
+
+    def test_line_rate(self):
+        stream = [self.rng.randrange(256) for _ in range(600)]
+        self.assertEqual(run_restrider(stream, self.rng), restrider_model(stream))
+
+    def test_resets(self):
+        # packets of any length, including ones which end partway through a word
+        stream = []
+        for _ in range(60):
+            stream.append(None)
+            stream += [self.rng.randrange(256) for _ in range(self.rng.randrange(12))]
+        self.assertEqual(run_restrider(stream, self.rng, gap_weights=(4, 1, 1)), restrider_model(stream))
+
+    def test_recovery(self):
+        # a reset partway through a word costs nothing over one between words
+        after = [self.rng.randrange(256) for _ in range(6)]
+        latency = restrider_recovery([], after)
+        self.assertIsNotNone(latency)
+        for length in range(1, 6):
+            before = [self.rng.randrange(256) for _ in range(length)]
+            self.assertEqual(restrider_recovery(before, after), latency)
+
+
+def describe_recovery(latencies):
+    """
+    Summary of recovery latencies in clocks, None for output which was lost.
+    """
+    measured = [latency for latency in latencies if latency is not None]
+    if not measured:
+        return "never"
+    summary = "{:.1f} clocks on average and {} at worst".format(sum(measured) / len(measured), max(measured))
+    if len(measured) < len(latencies):
+        summary += " ({} of {} lost)".format(len(latencies) - len(measured), len(latencies))
+    return summary
+
+def report(seed):
+    rng = random.Random(seed)
+    octets = [rng.randrange(256) for _ in range(100)]
+
+    levels, _ = uart_line(octets)
+    received, _ = run_uart(levels)
+    spacing = (received[-1][0] - received[0][0]) / (len(received) - 1)
+    print("UART: one octet every {:.1f} clocks back-to-back, {} clocks per bit".format(spacing, CYCLES_PER_BIT))
+
+    tolerated = []
+    for direction in [-1, 1]:
+        skew = 0.0
+        while skew < 0.1:
+            levels, _ = uart_line(octets, direction * (skew + 0.005))
+            received, errors = run_uart(levels)
+            if errors or [octet for _, octet in received] != octets:
+                break
+            skew += 0.005
+        tolerated.append(direction * skew)
+    print("UART: baud rate skew tolerated from {:+.1%} to {:+.1%}".format(*tolerated))
+
+    faults = sorted(rng.sample(range(len(octets) - 20), 10))
+    for gap in [0, 1]:
+        levels, ends = uart_line(octets, gaps=[gap] * len(octets), bad_stop=faults)
+        received, errors = run_uart(levels)
+        latencies = uart_recovery(uart_matches(octets, ends, received), faults)
+        print("UART: after a framing error with {} idle bits between frames, {:.1f} octets lost on average, {} at worst".format(
+            gap, sum(latencies) / len(latencies), max(latencies)))
+
+    packets = [random_packet(rng) for _ in range(40)]
+    stream = b''.join(cobs_encode(packet) + b'\0' for packet in packets)
+    for gap in range(3):
+        if run_cobs(stream, gap) == packets:
+            print("COBS: sustains one octet every {} clocks".format(gap + 1))
+            break
+    else:
+        print("COBS: fails even with two idle clocks between octets")
+
+    intact, damaged = [], []
+    for _ in range(RECOVERY_TRIALS):
+        encoded = cobs_encode(random_packet(rng, 100))
+        after = bytes(rng.randrange(256) for _ in range(1 + rng.randrange(20)))
+        intact.append(cobs_recovery(encoded + b'\0', after))
+        damaged.append(cobs_recovery(damage(rng, encoded) + b'\0', after))
+    print("COBS: the first octet of the next packet comes out {} after the end of a damaged packet, {} after an intact one".format(
+        describe_recovery(damaged), describe_recovery(intact)))
+
+    stream = bytearray()
+    expected = []
+    for _ in range(40):
+        data, events = random_lux(rng)
+        stream += data
+        expected += events
+    for gap in range(3):
+        if run_lux(bytes(stream), gap) == expected:
+            print("Lux: sustains one octet every {} clocks".format(gap + 1))
+            break
+    else:
+        print("Lux: fails even with two idle clocks between octets")
+
+    intact, damaged = [], []
+    for _ in range(RECOVERY_TRIALS):
+        data, _ = random_lux(rng)
+        payload = bytes(rng.randrange(256) for _ in range(1 + rng.randrange(20)))
+        intact.append(lux_recovery(data, payload))
+        damaged.append(lux_recovery(damage(rng, data[:-1]) + b'\0', payload))
+    print("Lux: the first payload octet of the next packet comes out {} after the end of a damaged packet, {} after an intact one".format(
+        describe_recovery(damaged), describe_recovery(intact)))
+
+    stream = [rng.randrange(256) for _ in range(600)]
+    intact = run_restrider(stream, rng) == restrider_model(stream)
+    print("Restrider: {} one octet every clock".format("sustains" if intact else "fails at"))
+
+    intact, damaged = [], []
+    for _ in range(RECOVERY_TRIALS):
+        after = [rng.randrange(256) for _ in range(3 * rng.randrange(1, 4))]
+        intact.append(restrider_recovery([rng.randrange(256) for _ in range(3 * rng.randrange(3))], after))
+        partial = [rng.randrange(256) for _ in range(3 * rng.randrange(3) + rng.choice([1, 2]))]
+        damaged.append(restrider_recovery(partial, after))
+    print("Restrider: the first word comes out {} after a reset partway through a word, {} after one between words".format(
+        describe_recovery(damaged), describe_recovery(intact)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seed', type=lambda x: int(x, 0), default=SEED)
+    report(parser.parse_args().seed)
@@ -63,13 +63,20 @@ def _test_rx(rx, dut):
     yield from assert_start()
     for bit in [1]*8:
         yield from send_bit(bit)
-    yield from assert_start()
+    yield from send_bit(0) # stop bit
     yield from assert_error()
 
-    # overflow error
+    # overflow error, when a second octet arrives before the first is read
     yield from assert_listening([1]*9)
-    yield from send_bit(0)
-    yield from assert_error()
+    for bit in [0] + [0]*8 + [1]:
+        yield from send_bit(bit)
+    assert (yield dut.rx_error) == 1
+
+    # the first octet is kept, and the error clears once the line is seen idle
+    yield from wait_bit()
+    yield from wait_bit()
+    assert (yield dut.rx_error) == 0
+    yield from assert_recieved(0xFF)
 
 def _test_tx(tx, dut):
     def wait_bit():
@@ -136,3 +143,52 @@ def test_tx():
     pads = _TestPads()
     dut = UART(pads, clk_freq=4800, baud_rate=1200)
     run_simulation(dut, _test_tx(pads.tx, dut), vcd_name="uart_tx.vcd")
+
+def _test_half_duplex(pads, dut):
+    assert (yield pads.de) == 0 # not driving the bus while idle
+
+    yield dut.tx_data.eq(0x00)
+    yield dut.tx_ready.eq(1)
+    yield
+    yield dut.tx_ready.eq(0)
+
+    # loop our own transmission back to the receiver, like a shared bus would
+    de_trace = []
+    tx_trace = []
+    for _ in range(60):
+        yield pads.rx.eq((yield pads.tx))
+        de_trace.append((yield pads.de))
+        tx_trace.append((yield pads.tx))
+        assert (yield dut.rx_ready) == 0 # our own byte is not echoed
+        assert (yield dut.rx_error) == 0
+        yield
+
+    # the driver is enabled a bit before the start bit...
+    first_driven = de_trace.index(1)
+    start_bit = tx_trace.index(0)
+    assert start_bit - first_driven >= 4
+
+    # ...and held through the stop bit and one bit of turnaround
+    stop_bit = len(tx_trace) - tx_trace[::-1].index(0)
+    last_driven = len(de_trace) - de_trace[::-1].index(1)
+    assert last_driven - stop_bit >= 8
+
+    # the receiver is still listening
+    yield pads.rx.eq(1)
+    yield
+    for bit in [0, 1, 0, 1, 0, 1, 0, 1, 0, 1]:
+        yield pads.rx.eq(bit)
+        yield; yield; yield; yield
+    yield; yield; yield; yield
+    assert (yield dut.rx_ready) == 1
+    assert (yield dut.rx_data) == 0x55
+
+class _TestHalfDuplexPads:
+    tx = Signal()
+    rx = Signal(reset=1)
+    de = Signal()
+
+def test_half_duplex():
+    pads = _TestHalfDuplexPads()
+    dut = UART(pads, clk_freq=4800, baud_rate=1200, half_duplex=True)
+    run_simulation(dut, _test_half_duplex(pads, dut), vcd_name="uart_half_duplex.vcd")
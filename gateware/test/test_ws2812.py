@@ -0,0 +1,51 @@
+from unittest import TestCase
+from migen import *
+from migen.genlib.fifo import SyncFIFOBuffered
+from .util import simulation_test
+from ..ws2812 import WS2812Controller
+
+class _TestPads:
+    def __init__(self):
+        self.tx = Signal()
+
+class WS2812Testbench(Module):
+    def __init__(self):
+        self.pads = _TestPads()
+        self.submodules.fifo = SyncFIFOBuffered(24, 4)
+        self.submodules.controller = WS2812Controller(self.pads, self.fifo, 12000000)
+
+    def capture(self, cycles):
+        tx = []
+        busy = []
+        for _ in range(cycles):
+            tx.append((yield self.pads.tx))
+            busy.append((yield self.controller.busy))
+            yield
+        return tx, busy
+
+class WS2812TestCase(TestCase):
+    def setUp(self):
+        self.tb = WS2812Testbench()
+
+    @simulation_test
+    def test_latch(self, tb):
+        yield from self.tb.fifo.write(0x0000ff)
+        yield self.tb.controller.write_en.eq(1)
+        yield
+        yield self.tb.controller.write_en.eq(0)
+        first, first_busy = yield from self.tb.capture(500)
+
+        # the next frame is ready as soon as the first one has been sent
+        yield from self.tb.fifo.write(0xff0000)
+        yield self.tb.controller.write_en.eq(1)
+        second, second_busy = yield from self.tb.capture(1500)
+
+        tx = first + second
+        busy = first_busy + second_busy
+        end = max(i for i, level in enumerate(first) if level)
+        resume = tx.index(1, end + 1)
+
+        # the line stays low for at least 50us between frames, and the controller is busy
+        # until then
+        self.assertGreaterEqual(resume - end, 600)
+        self.assertTrue(all(busy[busy.index(1):end + 600]))
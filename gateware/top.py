@@ -1,73 +1,274 @@
 from migen import *
-from migen.build.platforms import icestick
 from migen.genlib.fsm import FSM, NextValue, NextState
-from migen.genlib.fifo import SyncFIFOBuffered
 from migen.build.generic_platform import Subsignal, IOStandard, Pins
 from .uart import UART
+from .spi import SPITarget
 from .ws2812 import WS2812Controller
+from .apa102 import APA102Controller
 from .restrider import Restrider
+from .cobs import COBS
+from .lux import (
+    LuxReceiver,
+    CMD_FRAME, CMD_SYNC, CMD_WRITE_RANGE, CMD_SET_ADDRESS, CMD_SET_GROUPS, CMD_SET_PERIOD, CMD_SET_LENGTH, CMD_SET_MAP,
+    CMD_SET_BRIGHTNESS, CMD_SET_FADE,
+)
+from .framebuffer import Framebuffer
+from .scheduler import RefreshScheduler
+from .pixelmap import PixelMap
+from .blend import Blender
 from migen.genlib.io import CRG
 
 
 class TopModule(Module):
-    def __init__(self, plat):
-        neopixel_gpio = [
-            ('neopixel', 0,
-                Subsignal('tx', Pins('PMOD:0')),
-                IOStandard('LVCMOS33')
-            )
-        ]
-        plat.add_extension(neopixel_gpio)
+    def __init__(self, plat, n_pixels=8, max_pixels=256, address=0, groups=0, link='uart', rs485=False, led='ws2812',
+                 baud_rate=115200, fade=False, pixel_map=False):
+        if led == 'ws2812':
+            neopixel_gpio = [
+                ('neopixel', 0,
+                    Subsignal('tx', Pins('PMOD:0')),
+                    IOStandard('LVCMOS33')
+                )
+            ]
+            plat.add_extension(neopixel_gpio)
+        elif led == 'apa102':
+            apa102_gpio = [
+                ('apa102', 0,
+                    Subsignal('data', Pins('PMOD:0')),
+                    Subsignal('clk', Pins('PMOD:7')),
+                    IOStandard('LVCMOS33')
+                )
+            ]
+            plat.add_extension(apa102_gpio)
+        else:
+            raise ValueError("Unknown LED type {!r}".format(led))
+
+        if rs485:
+            # an external RS-485 transceiver, with the receiver permanently enabled
+            rs485_gpio = [
+                ('rs485', 0,
+                    Subsignal('rx', Pins('PMOD:1')),
+                    Subsignal('tx', Pins('PMOD:2')),
+                    Subsignal('de', Pins('PMOD:3')),
+                    IOStandard('LVCMOS33')
+                )
+            ]
+            plat.add_extension(rs485_gpio)
+
+        if link == 'spi':
+            spi_gpio = [
+                ('spi_target', 0,
+                    Subsignal('clk', Pins('PMOD:4')),
+                    Subsignal('mosi', Pins('PMOD:5')),
+                    Subsignal('cs_n', Pins('PMOD:6')),
+                    IOStandard('LVCMOS33')
+                )
+            ]
+            plat.add_extension(spi_gpio)
+
+        # created explicitly, as the platform only supplies a default when no other clock
+        # domains exist
+        self.submodules.crg = CRG(plat.request(plat.default_clk_name))
 
-        neopixel_pads = plat.request('neopixel')
         leds = plat.request('user_led')
-        serial_pads = plat.request('serial')
 
-        self.submodules.uart = UART(serial_pads, baud_rate=115200, clk_freq=12000000)
+        # the input link delivers the byte stream
+        if link == 'uart':
+            if rs485:
+                serial_pads = plat.request('rs485')
+            else:
+                serial_pads = plat.request('serial')
+
+            self.submodules.uart = UART(serial_pads, baud_rate=baud_rate, clk_freq=12000000, half_duplex=rs485)
+            link = self.uart
+        elif link == 'spi':
+            spi_pads = plat.request('spi_target')
+
+            self.clock_domains.cd_spi = ClockDomain(reset_less=True)
+            self.comb += self.cd_spi.clk.eq(spi_pads.clk)
+
+            self.submodules.spi = SPITarget(spi_pads, depth=64)
+            link = self.spi
+        else:
+            raise ValueError("Unknown input link {!r}".format(link))
+
+        self.submodules.cobs = COBS()
 
-        self.submodules.restrider = Restrider()
+        # octets are held in the link while the framebuffer cannot take pixels
+        link_enable = Signal()
 
         data = Signal(8)
-        self.submodules.uart_fsm = FSM()
-        self.uart_fsm.act('RX',
-            If(self.uart.rx_ready,
-                self.uart.rx_ack.eq(1),
-                NextValue(data, self.uart.rx_data),
+        self.submodules.link_fsm = FSM()
+        self.link_fsm.act('RX',
+            If(link.rx_ready & link_enable,
+                link.rx_ack.eq(1),
+                NextValue(data, link.rx_data),
                 NextState('INGEST'),
             )
         )
-        self.comb += self.restrider.data_in.eq(data)
-        self.uart_fsm.act('INGEST',
-            self.restrider.latch_data.eq(1),
+        self.comb += self.cobs.din.eq(data)
+        self.link_fsm.act('INGEST',
+            self.cobs.inclk.eq(1),
             NextState('RX'),
         )
 
-        N_PIXELS = 8
-        self.submodules.fifo = SyncFIFOBuffered(24, N_PIXELS)
+        self.submodules.lux = LuxReceiver(address=address, groups=groups)
+        self.comb += [
+            self.lux.din.eq(self.cobs.dout),
+            self.lux.stb.eq(self.cobs.outrdy),
+            self.lux.eop.eq(self.cobs.eop),
+            self.lux.abort.eq(self.cobs.error),
+        ]
+
+        # a range write starts with the 16-bit little-endian index of its first pixel
+        header = Signal(2)
+        self.sync += If(self.lux.start,
+            header.eq(2),
+        ).Elif(self.lux.data_stb & (header != 0),
+            header.eq(header - 1),
+        )
+
+        is_frame = Signal()
+        is_range = Signal()
+        self.comb += [
+            is_frame.eq(self.lux.cmd == CMD_FRAME),
+            is_range.eq(self.lux.cmd == CMD_WRITE_RANGE),
+        ]
+
+        # the restrider restarts at the beginning of every packet
+        self.submodules.restrider = ResetInserter()(Restrider())
+        self.comb += [
+            self.restrider.reset.eq(self.lux.start),
+            self.restrider.data_in.eq(self.lux.data),
+            self.restrider.latch_data.eq(self.lux.data_stb & (is_frame | (is_range & (header == 0)))),
+        ]
+
+        FRAME_RATE = 60
+        self.submodules.framebuffer = Framebuffer(24, max_pixels)
+        self.framebuffer.length.reset = n_pixels
+        self.submodules.scheduler = RefreshScheduler(clk_freq=12000000, frame_rate=FRAME_RATE)
+
+        # the fade and the pixel map do not fit into the ice40hx1k along with everything
+        # else, so they are only built when asked for
+        if fade:
+            # new frames fade in from the previous one over a number of refreshes set by the host
+            self.submodules.blend = Blender(self.framebuffer, max_pixels)
+            self.comb += [
+                self.blend.start.eq(self.framebuffer.started),
+                self.blend.swapped.eq(self.framebuffer.swapped),
+            ]
+            pixels = self.blend
+        else:
+            pixels = self.framebuffer
+
+        # short payloads of configuration packets are collected here, and applied when the
+        # packet passes its CRC check
+        argument = Signal(32)
+
+        # wide values are only compared with the strip length in its own width, as comparing
+        # all of their bits takes a carry chain long enough to get in the way of placement
+        length_bits = len(self.framebuffer.length)
+        too_long = Signal()
+        self.comb += too_long.eq((argument[length_bits:] != 0) | (argument[:length_bits] > max_pixels))
+
+        settings = {
+            CMD_SET_ADDRESS: self.lux.address.eq(argument),
+            CMD_SET_GROUPS: self.lux.groups.eq(argument),
+            CMD_SET_PERIOD: self.scheduler.period.eq(argument),
+            CMD_SET_LENGTH: self.framebuffer.length.eq(Mux(too_long, max_pixels, argument)),
+            'default': [],
+        }
+        if fade:
+            settings[CMD_SET_FADE] = self.blend.steps.eq(argument)
+        self.sync += [
+            If(self.lux.start,
+                argument.eq(0),
+            ).Elif(self.lux.data_stb,
+                argument.eq(Cat(argument[8:], self.lux.data)),
+            ),
+
+            If(self.lux.done,
+                Case(self.lux.cmd, settings),
+            ),
+        ]
+        self.comb += [
+            self.scheduler.resync.eq(self.lux.done & (self.lux.cmd == CMD_SYNC)),
+            self.scheduler.external.eq(self.scheduler.period == 0), # a zero period leaves timing to sync packets
+        ]
+
         pixel_data = Signal(24)
+        pixel_index = Signal(17) # a range write may start anywhere in the 16-bit index space
+
+        if pixel_map:
+            self.submodules.pixelmap = PixelMap(max_pixels)
+            self.comb += [
+                self.pixelmap.din.eq(self.lux.data),
+                self.pixelmap.stb.eq(self.lux.data_stb & (self.lux.cmd == CMD_SET_MAP)),
+                self.pixelmap.start.eq(self.lux.start),
+                self.pixelmap.commit.eq(self.lux.done & (self.lux.cmd == CMD_SET_MAP)),
+                self.pixelmap.discard.eq(self.lux.error & (self.lux.cmd == CMD_SET_MAP)),
+                self.pixelmap.logical.eq(pixel_index),
+                self.framebuffer.adr.eq(self.pixelmap.physical),
+                link_enable.eq(self.framebuffer.writable & self.pixelmap.ready),
+            ]
+        else:
+            self.comb += [
+                self.framebuffer.adr.eq(pixel_index),
+                link_enable.eq(self.framebuffer.writable),
+            ]
 
         self.submodules.slurp_fsm = FSM()
         self.slurp_fsm.act('IDLE',
-            self.fifo.we.eq(0),
-            If(self.restrider.done,
+            If(self.lux.start,
+                NextValue(pixel_index, 0),
+            ).Elif(self.lux.data_stb & is_range & (header != 0),
+                NextValue(pixel_index, Cat(pixel_index[8:16], self.lux.data)),
+            ).Elif(self.restrider.done,
                 self.restrider.out_read_ack.eq(1),
                 NextValue(pixel_data, self.restrider.data_out),
                 NextState('CHUNK'),
             )
         )
-        self.comb += self.fifo.din.eq(pixel_data)
+        self.comb += [
+            self.framebuffer.din.eq(pixel_data),
+            self.framebuffer.commit.eq(self.lux.done & (is_frame | is_range)),
+            # the last pixel of a packet is written before its CRC is checked, and is undone
+            # along with the others if the check fails
+            self.framebuffer.discard.eq(self.lux.error & (is_frame | is_range)),
+        ]
+        beyond = Signal()
+        self.comb += beyond.eq((pixel_index[length_bits:] != 0) | (pixel_index[:length_bits] >= self.framebuffer.length))
         self.slurp_fsm.act('CHUNK',
-            If(self.fifo.writable,
-                self.fifo.we.eq(1),
-            ),
-            NextState('IDLE'),
+            If(beyond, # drop pixels beyond the end of the strip
+                NextState('IDLE'),
+            ).Elif(self.framebuffer.writable,
+                self.framebuffer.we.eq(1),
+                NextValue(pixel_index, pixel_index + 1),
+                NextState('IDLE'),
+            )
         )
 
-        self.submodules.neopixels = WS2812Controller(neopixel_pads, self.fifo, 12000000)
-        self.comb += self.neopixels.write_en.eq(self.fifo.level == N_PIXELS)
+        if led == 'ws2812':
+            self.submodules.neopixels = WS2812Controller(plat.request('neopixel'), pixels, 12000000)
+            strip = self.neopixels
+        else:
+            self.submodules.apa102 = APA102Controller(plat.request('apa102'), pixels, 12000000, freq_tx=6e6)
+            strip = self.apa102
+            self.sync += If(self.lux.done & (self.lux.cmd == CMD_SET_BRIGHTNESS),
+                self.apa102.brightness.eq(argument),
+            )
+        # a tick which arrives before the strip has latched the previous frame, e.g. a sync
+        # packet, is held back until the strip is done, rather than lost
+        tick_pending = Signal()
+        self.sync += If(self.framebuffer.started,
+            tick_pending.eq(0),
+        ).Elif(self.scheduler.tick,
+            tick_pending.eq(1),
+        )
+        self.comb += [
+            strip.write_en.eq(pixels.readable),
+            self.framebuffer.tick.eq((self.scheduler.tick | tick_pending) & ~strip.busy),
+        ]
 
 if __name__ == '__main__':
-    plat = icestick.Platform()
-    top = TopModule(plat)
-    plat.build(top, run=True, build_dir="build")
-    plat.create_programmer().flash(0, "build/top.bin")
+    from .build import main
+    main()
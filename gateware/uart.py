@@ -11,7 +11,7 @@ class UART(Module):
 
     Parameters
     ----------
-    pads : {rx, tx}
+    pads : {rx, tx} or, when half_duplex is set, {rx, tx, de}
 
     clk_freq : int
         Base clock domain frequency.
@@ -19,6 +19,14 @@ class UART(Module):
     baud_rate : int
         Target baud rate.
 
+    half_duplex : bool
+        Drive a shared bus such as RS-485. The driver enable (de) is asserted one bit
+        before the start bit and held for turnaround bits after the stop bit, and the
+        receiver ignores the bus while we are driving it so our own bytes are not echoed.
+
+    turnaround : int
+        Number of bit periods the driver stays enabled after the stop bit.
+
     Attributes
     ----------
     rx_data : octet out
@@ -28,10 +36,12 @@ class UART(Module):
         High when rx_data contains a full octet.
 
     rx_ack : in
-        User should set high to signal that rx_data may be cleared and a new byte recieved.
+        User should set high to signal that rx_data may be cleared. The next octet may already be
+        arriving, and must be acknowledged by the end of its stop bit.
 
     rx_error : out
-        High when framing errors are encountered, or when a start bit occurs while rx_ready is asserted.
+        High when framing errors are encountered, or when an octet is received while rx_ready is still asserted.
+        The receiver recovers by itself once the line is seen idle at a bit sample.
 
     tx_data : octet in
         Transmit buffer. Considered valid when tx_ready is set high.
@@ -42,7 +52,9 @@ class UART(Module):
     tx_ack : out
         High when tx core is IDLE, low during transmit.
     """
-    def __init__(self, pads, clk_freq, baud_rate):
+    def __init__(self, pads, clk_freq, baud_rate, half_duplex=False, turnaround=1):
+        self.pads = pads
+
         self.rx_data = Signal(8)
         self.rx_ready = Signal()
         self.rx_ack = Signal()
@@ -58,6 +70,9 @@ class UART(Module):
 
         ### RX CORE ###
 
+        # the line we listen to
+        rx = Signal()
+
         # divider counter for baud clock
         self.rx_counter = Signal(max=divisor)
 
@@ -67,8 +82,17 @@ class UART(Module):
         # what bit are we on?
         self.rx_bitno = Signal(max=8)
 
+        # bits are shifted in here, and loaded into rx_data at the stop bit
+        rx_shift = Signal(8)
+        rx_load = Signal()
+
         ###
 
+        if half_duplex:
+            self.comb += rx.eq(pads.rx | pads.de) # a driven bus reads as idle, suppressing our own echo
+        else:
+            self.comb += rx.eq(pads.rx)
+
         # the strobe goes high when the counter resets
         self.comb += self.rx_strobe.eq(self.rx_counter == 0)
         self.sync += If(self.rx_counter == 0,
@@ -81,20 +105,29 @@ class UART(Module):
         self.submodules.rx_fsm = FSM(reset_state='IDLE')
 
         self.rx_fsm.act('IDLE',
-            If(~pads.rx, # If we hit a start bit
-                NextValue(self.rx_counter, divisor // 2 ), # shift halfway through the rx counter;
-                                                          # this offsets our bit reads to the middle of the pulse, improving read stability
+            If(~rx, # If we hit a start bit
+                NextValue(self.rx_counter, divisor // 2 - 1), # shift halfway through the rx counter;
+                                                             # this offsets our bit reads to the middle of the pulse, improving read stability
+                                                             # (less one for the cycle taken to see the edge)
                 NextState('START'),
             )
         )
 
-        # START state just waits one half strobe.
+        # START state waits one half strobe, and checks that the start bit is still there,
+        # so that glitches shorter than half a bit are ignored.
         self.rx_fsm.act('START',
-            If(self.rx_strobe, NextState('DATA')))
+            If(self.rx_strobe,
+                If(rx,
+                    NextState('IDLE'),
+                ).Else(
+                    NextState('DATA'),
+                )
+            )
+        )
 
         self.rx_fsm.act('DATA',
             If(self.rx_strobe,
-                NextValue(self.rx_data, Cat(self.rx_data[1:8], pads.rx)), # shift in a new bit
+                NextValue(rx_shift, Cat(rx_shift[1:8], rx)), # shift in a new bit
                 NextValue(self.rx_bitno, self.rx_bitno + 1),
                 If(self.rx_bitno == 7, # if we're done
                     NextState('STOP')  # go to the stop state
@@ -102,29 +135,38 @@ class UART(Module):
             )
         )
 
+        # the octet moves to rx_data at the stop bit, so that the next one can be shifted in
+        # while the user reads it
         self.rx_fsm.act('STOP',
             If(self.rx_strobe,
-                If(~pads.rx, # if we didn't get a stop bit
+                If(~rx, # if we didn't get a stop bit
                     NextState('ERROR') # assert an error
+                ).Elif(self.rx_ready & ~self.rx_ack, # if the last octet still hasn't been read
+                    NextState('ERROR')
                 ).Else(
-                    NextState('FULL')
+                    NextValue(self.rx_data, rx_shift),
+                    rx_load.eq(1),
+                    NextState('IDLE')
                 )
             )
         )
 
-        self.rx_fsm.act('FULL',
-            If(self.rx_ack,        # if read data was acknowledged
-                NextState('IDLE')  # get ready for a new byte
-            ).Elif(~pads.rx,
-                NextState('ERROR') # if we see a start bit and we still are sitting on data, assert an error.
+        # wait for the line to go idle before hunting for the next start bit
+        self.rx_fsm.act('ERROR',
+            If(self.rx_strobe & rx,
+                NextState('IDLE'),
             )
         )
 
         # assert the error line when we're in the error state
         self.comb += self.rx_error.eq(self.rx_fsm.ongoing('ERROR'))
 
-        # assert the ready line when we're in the full state
-        self.comb += self.rx_ready.eq(self.rx_fsm.ongoing('FULL'))
+        # the ready line is held from the stop bit until the octet is acknowledged
+        self.sync += If(rx_load,
+            self.rx_ready.eq(1),
+        ).Elif(self.rx_ack,
+            self.rx_ready.eq(0),
+        )
 
         ### TX CORE ###
 
@@ -191,6 +233,23 @@ class UART(Module):
         self.tx_fsm.act('STOP',
             If(self.tx_strobe,
                 NextValue(pads.tx, 1),  # TX := stop bit
-                NextState('IDLE'),
+                NextState('TURNAROUND' if half_duplex else 'IDLE'),
             )
         )
+
+        if half_duplex:
+            # how many bit periods we have held the bus since the stop bit began
+            self.tx_hold = Signal(max=turnaround + 2)
+
+            # we drive the bus whenever we are not IDLE
+            self.comb += pads.de.eq(~self.tx_fsm.ongoing('IDLE'))
+
+            self.tx_fsm.act('TURNAROUND',
+                If(self.tx_strobe,
+                    NextValue(self.tx_hold, self.tx_hold + 1),
+                    If(self.tx_hold == turnaround, # the stop bit and turnaround are over
+                        NextValue(self.tx_hold, 0),
+                        NextState('IDLE'),
+                    )
+                )
+            )
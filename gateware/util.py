@@ -1,3 +1,6 @@
+from migen import Memory
+
+
 def closest_divisor(freq_base, freq_target, max_ppm=None):
     divisor = round(freq_base / freq_target)
 
@@ -9,3 +12,17 @@ def closest_divisor(freq_base, freq_target, max_ppm=None):
         raise ValueError("Output frequency deviation is too high ({} ppm)".format(ppm))
 
     return divisor
+
+
+class UncheckedMemory(Memory):
+    """
+    Memory which is never read at an address in the same cycle as it is written
+
+    Synthesis otherwise has to assume that such reads happen, and adds a register and a
+    multiplexer per read port to return the data the port's mode promises. Read ports must be
+    READ_FIRST, as WRITE_FIRST ones register the address, and so pass written data through by
+    construction. Simulation is unaffected.
+    """
+    @staticmethod
+    def emit_verilog(memory, ns, add_data_file):
+        return "(* no_rw_check *)\n" + Memory.emit_verilog(memory, ns, add_data_file)
@@ -70,7 +70,7 @@ class WS2812PHY(Module):
         )
 
         latch_cycles = int(freq_base * latch_length)
-        self.latch_counter = Signal(max=latch_cycles, reset=0)
+        self.latch_counter = Signal(max=latch_cycles + 1, reset=0)
         self.tx_fsm.act('LATCH',
             If(self.latch_counter == latch_cycles,
                 NextValue(self.latch_counter, 0),
@@ -82,13 +82,36 @@ class WS2812PHY(Module):
         )
 
 class WS2812Controller(Module):
+    """
+    WS2812 strip driver
+
+    Sends pixels from in_fifo until it is no longer readable, then holds the line low for
+    the latch time, so that the strip shows the frame before the next one begins.
+
+    Parameters
+    ----------
+    pads : {tx}
+
+    in_fifo : FIFO-like
+        Source of pixels; a frame ends when it is no longer readable.
+
+    freq_base : int
+        Base clock domain frequency.
+
+    Attributes
+    ----------
+    write_en : in
+        Starts a frame.
+
+    busy : out
+        High from the start of a frame until its latch time has passed.
+    """
     def __init__(self, pads, in_fifo, freq_base, **kwargs):
         self.write_en = Signal()
+        self.busy = Signal()
 
         ###
 
-        data = Signal(24)
-
         self.submodules.phy = WS2812PHY(pads, 24, freq_base, **kwargs)
 
         self.submodules.framing_fsm = FSM()
@@ -100,17 +123,17 @@ class WS2812Controller(Module):
 
         self.framing_fsm.act('DEQUEUE',
             If(in_fifo.readable,
-                in_fifo.re.eq(1),
-                NextValue(data, in_fifo.dout),
                 NextState('WRITE'),
             ).Else(
-                NextState('IDLE'),
+                NextState('LATCH'),
             )
         )
 
-        self.comb += self.phy.data.eq(data)
+        # the PHY latches the pixel as it accepts it, so it is taken straight from in_fifo
+        self.comb += self.phy.data.eq(in_fifo.dout)
         self.framing_fsm.act('WRITE',
             If(self.phy.tx_ack,
+                in_fifo.re.eq(1),
                 self.phy.tx_ready.eq(1),
                 NextState('WRITE-WAIT')
             )
@@ -122,6 +145,21 @@ class WS2812Controller(Module):
             )
         )
 
+        self.framing_fsm.act('LATCH',
+            If(self.phy.tx_ack,
+                self.phy.tx_latch.eq(1),
+                NextState('LATCH-WAIT')
+            )
+        )
+
+        self.framing_fsm.act('LATCH-WAIT',
+            If(self.phy.tx_ack,
+                NextState('IDLE')
+            )
+        )
+
+        self.comb += self.busy.eq(~self.framing_fsm.ongoing('IDLE'))
+
 if __name__ == '__main__':
     from migen.build.platforms import icestick
     def tb(dut):
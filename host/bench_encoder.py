@@ -0,0 +1,37 @@
+"""
+Micro-benchmark of FrameEncoder against per-pixel packing as done in client.py.
+
+    python -m host.bench_encoder
+"""
+import struct
+import timeit
+
+import numpy as np
+
+from .encoder import FrameEncoder
+from .lux import packet, CMD_FRAME, BROADCAST
+
+
+def reference(pixels):
+    dat = b''.join(struct.pack('>L', (g << 16) | (r << 8) | b)[1:] for r, g, b in pixels.tolist())
+    return packet(BROADCAST, CMD_FRAME, dat)
+
+
+def bench(f, pixels, number):
+    seconds = min(timeit.repeat(lambda: f(pixels), number=number, repeat=5)) / number
+    return len(pixels) / (seconds * 1000)
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    encoder = FrameEncoder(gamma=2.2, brightness=0.8)
+
+    print("{:>8} {:>16} {:>16} {:>16}".format("pixels", "uint8 px/ms", "float px/ms", "reference px/ms"))
+    for n in (256, 4096, 65536):
+        pixels = rng.integers(0, 256, (n, 3), dtype=np.uint8)
+        print("{:>8} {:>16.0f} {:>16.0f} {:>16.0f}".format(
+            n,
+            bench(encoder.encode, pixels, 20),
+            bench(encoder.encode, pixels / 255, 20),
+            bench(reference, pixels, 1),
+        ))
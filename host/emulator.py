@@ -0,0 +1,444 @@
+"""
+Software model of a luna board behind a pseudo-terminal, for testing host software
+without hardware.
+
+    python -m host.emulator --baud 115200 --pixels 8
+
+prints the path of a serial port which behaves like the board: bytes are consumed no
+faster than the UART receives them, so host writes block once the pty buffer is full,
+and frames are displayed at the board's refresh rate for as long as the LEDs take to
+clock them out.
+"""
+import argparse
+import os
+import select
+import sys
+import time
+import tty
+import zlib
+
+from gateware.util import closest_divisor
+from .lux import (
+    matches,
+    CMD_FRAME, CMD_SYNC, CMD_WRITE_RANGE, CMD_SET_ADDRESS, CMD_SET_GROUPS, CMD_SET_PERIOD, CMD_SET_LENGTH, CMD_SET_MAP,
+    CMD_SET_BRIGHTNESS, CMD_SET_FADE,
+)
+
+
+CLK_FREQ = 12000000
+
+
+def blend(a, b, alpha):
+    """
+    Interpolates each channel of pixel a towards b, as the Blender does, with alpha out of 256.
+    """
+    return sum(((x + (((y - x) * alpha) >> 8)) & 0xff) << shift
+        for shift in (0, 8, 16)
+        for x, y in [((a >> shift) & 0xff, (b >> shift) & 0xff)])
+
+
+class Board:
+    """
+    Model of TopModule's packet handling, framebuffer and refresh timing.
+
+    Octets are processed one at a time, as the gateware does: the COBS decoder and the
+    Lux receiver run as octets arrive, pixels are written as soon as they leave the
+    receiver's four-octet CRC window, and a packet only takes effect once its delimiter
+    has arrived and its CRC has been checked. The pixels of a damaged frame or range write
+    are then undone, by rolling the back buffer back to the committed frame. Map entries
+    are held back until their packet has passed the check, like the gateware's inactive
+    map bank.
+
+    Parameters
+    ----------
+    n_pixels : int
+        Strip length after reset.
+
+    max_pixels : int
+        Framebuffer size.
+
+    address : int
+        Device address after reset.
+
+    groups : int
+        Multicast group mask after reset.
+
+    frame_rate : int
+        Refresh rate after reset.
+
+    led : str
+        'ws2812' or 'apa102', used to model how long a frame takes to clock out.
+
+    fade : bool
+        Whether the gateware was built with the fade, and takes fade packets.
+
+    pixel_map : bool
+        Whether the gateware was built with the pixel map, and takes map packets.
+
+    Attributes
+    ----------
+    on_frame : callable or None
+        Called with the time and pixels of every newly displayed frame, including each
+        step of a fade.
+    """
+    def __init__(self, n_pixels=8, max_pixels=256, address=0, groups=0, frame_rate=60, led='ws2812',
+                 fade=False, pixel_map=False):
+        self.max_pixels = max_pixels
+        self.length = n_pixels
+        self.address = address
+        self.groups = groups
+        self.period = closest_divisor(CLK_FREQ, frame_rate)
+        self.led = led
+        self.brightness = 31
+        self.has_fade = fade
+        self.has_map = pixel_map
+
+        # map entries are as wide as a pixel index, and may still point past the end of the
+        # frame when max_pixels is not a power of two
+        self.map = list(range(max_pixels))
+        self.map_mask = (1 << max(1, (max_pixels - 1).bit_length())) - 1
+        self.back = [0] * max_pixels
+        self.ready = [0] * max_pixels
+        self.front = [0] * max_pixels
+        self.pending = False
+
+        # what is on display, and the fade towards the front buffer
+        self.fade = 0
+        self.step = 0
+        self.fading = False
+        self.shown = [0] * max_pixels
+        self.origin = [0] * max_pixels
+
+        # next tick of the refresh timebase, end of the scanout in progress, and whether a
+        # tick waits for it to end
+        self.next_tick = 0.0
+        self.busy_until = 0.0
+        self.deferred = False
+        self.on_frame = None
+
+        # COBS decoder: code of the current block, data octets left in it, and whether a
+        # zero is owed once the next block begins
+        self.code = 0
+        self.remaining = 0
+        self.zero = False
+
+        # Lux receiver
+        self.window = bytearray()
+        self.crc = 0
+        self.pos = 0
+        self.destination = bytearray()
+        self.command = None
+        self.matched = False
+
+        # payload consumers
+        self.argument = 0
+        self.header = 0
+        self.index = 0
+        self.word = bytearray()
+        self.map_stream = bytearray()
+        self.map_index = None
+        self.map_entries = {}
+
+        self.stats = dict.fromkeys([
+            'bytes', 'packets', 'errors', 'committed', 'dropped', 'displayed', 'refreshes', 'skipped',
+        ], 0)
+
+    def feed(self, data, now):
+        """
+        Consumes octets received at time now.
+        """
+        self.stats['bytes'] += len(data)
+        for octet in data:
+            self.decode(octet, now)
+
+    def decode(self, octet, now):
+        """
+        COBS decoder.
+        """
+        if octet == 0:
+            # a delimiter in the middle of a block means the packet is damaged
+            damaged = self.remaining != 0
+            self.remaining = 0
+            self.zero = False
+            self.end(damaged, now)
+        elif self.remaining == 0:
+            if self.zero:
+                self.receive(0)
+            self.code = octet
+            self.remaining = octet - 1
+            self.zero = octet == 1
+        else:
+            self.receive(octet)
+            self.remaining -= 1
+            if self.remaining == 0:
+                self.zero = self.code < 255
+
+    def receive(self, octet):
+        """
+        Lux receiver: octets leave a four-octet window, which holds the CRC once the packet
+        ends, and make up the packet body.
+        """
+        self.window.append(octet)
+        if len(self.window) <= 4:
+            return
+
+        body = self.window.pop(0)
+        self.crc = zlib.crc32(bytes([body]), self.crc)
+        if self.pos < 4:
+            self.destination.append(body)
+            self.pos += 1
+        elif self.pos == 4:
+            self.command = body
+            self.matched = matches(int.from_bytes(self.destination, 'little'), self.address, self.groups)
+            self.pos = 5
+            if self.matched:
+                self.start()
+        elif self.matched:
+            self.data(body)
+
+    def start(self):
+        self.stats['packets'] += 1
+        self.argument = 0
+        self.header = 2
+        self.index = 0
+        self.word = bytearray()
+        self.map_stream = bytearray()
+        self.map_index = None
+        self.map_entries = {}
+
+    def data(self, octet):
+        """
+        Payload octets, acted on as they arrive, before the CRC is checked.
+        """
+        # configuration arguments are the last four octets of the payload
+        self.argument = (self.argument >> 8) | (octet << 24)
+
+        if self.command == CMD_WRITE_RANGE and self.header:
+            # the 16-bit little-endian index of the first pixel
+            self.index = (self.index >> 8) | (octet << 8)
+            self.header -= 1
+        elif self.command in (CMD_FRAME, CMD_WRITE_RANGE):
+            self.word.append(octet)
+            if len(self.word) == 3:
+                if self.index < self.length:
+                    physical = self.map[self.index]
+                    if physical < self.max_pixels:
+                        self.back[physical] = int.from_bytes(self.word, 'big')
+                    self.index += 1
+                self.word = bytearray()
+        elif self.command == CMD_SET_MAP:
+            self.map_stream.append(octet)
+            if len(self.map_stream) == 2:
+                entry = int.from_bytes(self.map_stream, 'little')
+                self.map_stream = bytearray()
+                if self.map_index is None:
+                    self.map_index = entry
+                else:
+                    if self.map_index < self.max_pixels:
+                        self.map_entries[self.map_index] = entry & self.map_mask
+                    self.map_index += 1
+
+    def end(self, damaged, now):
+        """
+        End of a packet, which takes effect if it is addressed to us and intact.
+        """
+        valid = (not damaged and self.matched and len(self.window) == 4 and self.pos == 5 and
+            self.crc == int.from_bytes(self.window, 'little'))
+        if self.matched and not valid:
+            self.stats['errors'] += 1
+            if self.command in (CMD_FRAME, CMD_WRITE_RANGE):
+                self.back = list(self.ready)
+
+        self.window = bytearray()
+        self.crc = 0
+        self.pos = 0
+        self.destination = bytearray()
+        self.matched = False
+        if not valid:
+            return
+
+        command, argument = self.command, self.argument
+        if command in (CMD_FRAME, CMD_WRITE_RANGE):
+            # the back buffer becomes the ready frame, and the new back buffer starts out
+            # as a copy of it
+            if self.pending:
+                self.stats['dropped'] += 1
+            self.ready = list(self.back)
+            self.pending = True
+            self.stats['committed'] += 1
+        elif command == CMD_SET_MAP:
+            if self.has_map:
+                for index, entry in self.map_entries.items():
+                    self.map[index] = entry
+        elif command == CMD_SYNC:
+            self.tick(now)
+            self.next_tick = now + self.period / CLK_FREQ
+        elif command == CMD_SET_ADDRESS:
+            self.address = argument
+        elif command == CMD_SET_GROUPS:
+            self.groups = argument
+        elif command == CMD_SET_PERIOD:
+            self.period = argument & 0xffffff
+        elif command == CMD_SET_LENGTH:
+            self.length = min(argument, self.max_pixels)
+        elif command == CMD_SET_BRIGHTNESS:
+            self.brightness = argument & 0x1f
+        elif command == CMD_SET_FADE:
+            if self.has_fade:
+                self.fade = argument & 0xffff
+
+    def frame_time(self):
+        """
+        Time taken to clock out and latch a frame.
+        """
+        if self.led == 'apa102':
+            return 32 * (self.length + (self.length >> 6) + 3) / (CLK_FREQ / 2)
+        return 24 * self.length * 1.25e-6 + 5.41e-5
+
+    def advance(self, now):
+        """
+        Runs the refresh timebase up to time now. A zero period leaves timing to sync packets.
+        """
+        if self.deferred and now >= self.busy_until:
+            self.tick(self.busy_until)
+
+        if self.period == 0:
+            self.next_tick = float('inf')
+            return
+
+        period = self.period / CLK_FREQ
+        self.next_tick = min(self.next_tick, now + period)
+        if now >= self.next_tick:
+            self.tick(now)
+            self.next_tick += period
+            if self.next_tick <= now: # we fell behind, e.g. after the period changed
+                self.next_tick = now + period
+
+    def tick(self, now):
+        """
+        Starts a refresh at time now. While the previous one is still being clocked out, the
+        refresh is deferred until it ends instead, and merged with any other tick meanwhile.
+        """
+        if now < self.busy_until:
+            if self.deferred:
+                self.stats['skipped'] += 1
+            self.deferred = True
+            return
+
+        self.deferred = False
+        self.stats['refreshes'] += 1
+        self.busy_until = now + self.frame_time()
+
+        if self.pending:
+            self.front = self.ready
+            self.pending = False
+            self.stats['displayed'] += 1
+
+            self.origin = list(self.shown)
+            self.step = 1
+            self.fading = self.fade > 1
+        elif self.fading and self.step < self.fade:
+            self.step += 1
+        else:
+            self.fading = False
+            return
+
+        alpha = (self.step << 8) // self.fade if self.fading else 256
+        self.shown = [blend(a, b, alpha) for a, b in zip(self.origin, self.front)]
+        if self.on_frame is not None:
+            self.on_frame(now, self.pixels())
+
+    def pixels(self):
+        return self.shown[:self.length]
+
+
+class Emulator:
+    """
+    Serves a Board on a pseudo-terminal.
+
+    Parameters
+    ----------
+    board : Board
+
+    baud_rate : int
+        Line rate; every octet takes ten bit periods.
+
+    """
+    def __init__(self, board, baud_rate=115200):
+        self.board = board
+        self.byte_rate = baud_rate / 10
+
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+    def run(self, duration=None):
+        start = last = time.monotonic()
+
+        # octets the line has delivered but we have not yet read; capped so that an idle
+        # line cannot save up for a burst faster than the baud rate
+        credit = 0.0
+        max_credit = max(1.0, self.byte_rate * 0.005)
+
+        while duration is None or last - start < duration:
+            now = time.monotonic()
+            credit = min(credit + (now - last) * self.byte_rate, max_credit)
+            last = now
+
+            self.board.advance(now)
+
+            # sleep until the line has delivered an octet, or until the next tick, which may be
+            # one held back by a refresh in progress
+            next_tick = self.board.next_tick
+            if self.board.deferred:
+                next_tick = min(next_tick, self.board.busy_until)
+            timeout = min(next_tick, now + max(0.0, 1 - credit) / self.byte_rate) - now
+            if duration is not None:
+                timeout = min(timeout, start + duration - now)
+            if credit < 1:
+                time.sleep(max(0.0, timeout))
+                continue
+
+            readable, _, _ = select.select([self.master], [], [], max(0.0, timeout))
+            if readable:
+                data = os.read(self.master, int(credit))
+                credit -= len(data)
+                self.board.feed(data, now)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--baud', type=int, default=115200)
+    parser.add_argument('--pixels', type=int, default=8)
+    parser.add_argument('--max-pixels', type=int, default=256)
+    parser.add_argument('--address', type=lambda x: int(x, 0), default=0)
+    parser.add_argument('--groups', type=lambda x: int(x, 0), default=0)
+    parser.add_argument('--frame-rate', type=int, default=60)
+    parser.add_argument('--led', choices=['ws2812', 'apa102'], default='ws2812')
+    parser.add_argument('--fade', action='store_true', help="model gateware built with fade=True")
+    parser.add_argument('--pixel-map', action='store_true', help="model gateware built with pixel_map=True")
+    parser.add_argument('--interval', type=float, default=1.0, help="statistics interval, in seconds")
+    args = parser.parse_args()
+
+    board = Board(args.pixels, args.max_pixels, args.address, args.groups, args.frame_rate, args.led,
+                  args.fade, args.pixel_map)
+    emulator = Emulator(board, args.baud)
+    print(emulator.port, flush=True)
+
+    try:
+        while True:
+            before = dict(board.stats)
+            emulator.run(args.interval)
+            print(' '.join('{}={}'.format(k, v - before[k]) for k, v in board.stats.items()), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import struct
+import zlib
+
+import numpy as np
+
+from .lux import CMD_FRAME, CMD_WRITE_RANGE, BROADCAST
+
+
+def cobs_encode(data):
+    """
+    Vectorized equivalent of host.lux.cobs_encode, returning a uint8 array.
+    """
+    data = np.frombuffer(data, dtype=np.uint8)
+
+    # prepend the zero whose position holds the first code; the final code
+    # points one past the end, where cobs_encode appends its zero
+    x = np.empty(len(data) + 1, dtype=np.uint8)
+    x[0] = 0
+    x[1:] = data
+
+    # a block holds at most 254 octets, so every run of 254 nonzero octets is
+    # followed by an extra code (0xFF), which we model as an inserted zero
+    zeros = np.flatnonzero(x == 0)
+    runs = np.diff(np.append(zeros, len(x))) - 1
+    splits = runs // 254
+    if splits.any():
+        n = splits.sum()
+        first = np.repeat(np.cumsum(splits) - splits, splits)
+        positions = np.repeat(zeros + 1, splits) + 254 * (np.arange(n) - first + 1)
+        x = np.insert(x, positions, 0)
+        zeros = np.flatnonzero(x == 0)
+
+    # each zero is replaced by the distance to the next one
+    x[zeros] = np.diff(np.append(zeros, len(x)))
+    return x
+
+
+class FrameEncoder:
+    """
+    Encodes pixel arrays into CMD_FRAME or CMD_WRITE_RANGE packets.
+
+    Parameters
+    ----------
+    destination : int
+        Packet destination address.
+
+    order : str
+        The three channels to send for every pixel, taken from the input's R, G, B and W
+        columns. WS2812 strips expect 'GRB', APA102 strips 'BGR'.
+
+    gamma : float or None
+        Gamma correction exponent.
+
+    brightness : float
+        Global brightness scale, from 0 to 1.
+    """
+    def __init__(self, destination=BROADCAST, order='GRB', gamma=None, brightness=1.0):
+        self.destination = destination
+        self.header = struct.pack('<LB', destination, CMD_FRAME)
+        if len(order) != 3:
+            # the board takes three octets per pixel
+            raise ValueError("Channel order {!r} does not name three channels".format(order))
+        self.order = order
+        self.channels = ['RGBW'.index(c) for c in order]
+        self.gamma = gamma
+        self.brightness = brightness
+
+        # uint8 input is corrected with a lookup table
+        levels = np.arange(256) / 255
+        if gamma is not None:
+            levels = levels ** gamma
+        self.lut = np.round(levels * brightness * 255).astype(np.uint8)
+
+    def pixels(self, pixels):
+        """
+        Converts an (N, 3) RGB or (N, 4) RGBW array of uint8 or of floats in [0, 1]
+        to the frame payload.
+        """
+        pixels = np.asarray(pixels)
+        if pixels.ndim != 2 or pixels.shape[1] not in (3, 4):
+            raise ValueError("Expected an (N, 3) or (N, 4) array, got {}".format(pixels.shape))
+        if max(self.channels) >= pixels.shape[1]:
+            raise ValueError("Channel order {!r} needs a W column".format(self.order))
+
+        selected = pixels[:, self.channels]
+        if selected.dtype == np.uint8:
+            return self.lut.take(selected)
+        if not np.issubdtype(selected.dtype, np.floating):
+            # wider integers have no agreed full scale, so don't guess one
+            raise ValueError("Expected uint8 or float pixels, got {}".format(selected.dtype))
+        if not np.isfinite(selected).all():
+            raise ValueError("Expected finite pixel values")
+
+        values = np.clip(selected, 0, 1)
+        if self.gamma is not None:
+            values = values ** self.gamma
+        return np.round(values * (self.brightness * 255)).astype(np.uint8)
+
+    def encode(self, pixels, start=None):
+        """
+        Returns a delimited packet, ready to be written to the wire. If start is given, only
+        the pixels from that index onwards are updated and the rest of the frame is kept.
+        """
+        if start is None:
+            header = self.header
+        else:
+            header = struct.pack('<LBH', self.destination, CMD_WRITE_RANGE, start)
+        body = header + self.pixels(pixels).tobytes()
+        body += struct.pack('<L', zlib.crc32(body))
+        return cobs_encode(body).tobytes() + b'\0'
@@ -0,0 +1,92 @@
+import struct
+import zlib
+
+from gateware.lux import (
+    CMD_FRAME, CMD_SYNC, CMD_WRITE_RANGE, CMD_SET_ADDRESS, CMD_SET_GROUPS, CMD_SET_PERIOD, CMD_SET_LENGTH, CMD_SET_MAP,
+    CMD_SET_BRIGHTNESS, CMD_SET_FADE,
+    BROADCAST, MULTICAST,
+)
+
+
+def cobs_encode(data):
+    output = bytearray()
+    data = bytes(data) + b'\0'
+    ptr = 0
+    while ptr < len(data):
+        next_zero = data.index(b'\0', ptr)
+        if next_zero - ptr >= 254:
+            output += b'\xFF' + data[ptr:ptr+254]
+            ptr += 254
+        else:
+            output += bytes((next_zero - ptr + 1,)) + data[ptr:next_zero]
+            ptr = next_zero + 1
+    return bytes(output)
+
+
+def cobs_decode(data):
+    """
+    Inverse of cobs_encode, for a packet without its delimiter.
+    """
+    output = bytearray()
+    ptr = 0
+    while ptr < len(data):
+        ctr = data[ptr]
+        if ctr == 0 or ptr + ctr > len(data):
+            raise ValueError("COBS decoding failed")
+        output += data[ptr + 1:ptr + ctr]
+        if ctr < 255:
+            output += b'\0'
+        ptr += ctr
+    return bytes(output[:-1])
+
+
+def crc(data):
+    return struct.pack('<L', zlib.crc32(data))
+
+
+def packet(destination, command, payload=b''):
+    """
+    Builds a delimited Lux packet, ready to be written to the wire.
+    """
+    body = struct.pack('<LB', destination, command) + bytes(payload)
+    return cobs_encode(body + crc(body)) + b'\0'
+
+
+def multicast(groups):
+    return MULTICAST | groups
+
+
+def matches(destination, address, groups):
+    """
+    Whether a device with this address and multicast groups accepts a packet.
+    """
+    if destination == BROADCAST:
+        return True
+    if destination & MULTICAST:
+        return bool(destination & groups & ~MULTICAST)
+    return destination == address
+
+
+def range_payload(pixels, start=0):
+    """
+    Payload of a CMD_WRITE_RANGE packet writing 24-bit pixels from index start onwards.
+    """
+    return struct.pack('<H', start) + b''.join(pixel.to_bytes(3, 'big') for pixel in pixels)
+
+
+def map_payload(entries, start=0):
+    """
+    Payload of a CMD_SET_MAP packet writing entries from index start onwards.
+    """
+    return struct.pack('<{}H'.format(len(entries) + 1), start, *entries)
+
+
+def serpentine(width, height):
+    """
+    Pixel map for a matrix wired row by row, with every other row running backwards.
+    """
+    entries = []
+    for y in range(height):
+        row = range(y * width, (y + 1) * width)
+        entries.extend(reversed(row) if y % 2 else row)
+    return entries
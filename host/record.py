@@ -0,0 +1,239 @@
+"""
+Recording and replay of the octet stream sent to a board.
+
+    python -m host.record info show.lux
+    python -m host.record replay show.lux /dev/ttyUSB0 --speed 2
+
+A trace is an append-only log: a magic string followed by one record per write, each a
+little-endian 64-bit timestamp in nanoseconds, a 32-bit length and the octets written.
+Timestamps are taken from a monotonic clock, offset to the wall-clock time at which the
+recording started, so that clock adjustments cannot reorder records.
+
+Records are flushed to the operating system as they are written, so a trace cut short by
+a crash of the recording process loses at most its last record.
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+
+
+MAGIC = b'LUNATRC1'
+
+RECORD = struct.Struct('<QL')
+
+
+class Recorder:
+    """
+    Wraps a serial port, or anything else with a write method, logging every write.
+
+    Parameters
+    ----------
+    port : file-like or None
+        Where writes go. With None, writes are only logged.
+
+    path : str
+        Trace file, appended to if it exists.
+
+    flush_every : int
+        Records written between flushes of the trace file. Larger values save system
+        calls, at the cost of losing up to that many records in a crash.
+
+    Other attributes are passed through to port, so a Recorder can stand in for it.
+    """
+    def __init__(self, port, path, flush_every=1):
+        self.port = port
+        self.flush_every = flush_every
+        self.unflushed = 0
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+
+        # wall-clock time is read once, and only the monotonic clock after that
+        self.epoch = time.time_ns() - time.monotonic_ns()
+
+    def write(self, data):
+        self.record(data, self.epoch + time.monotonic_ns())
+        if self.port is not None:
+            return self.port.write(data)
+        return len(data)
+
+    def record(self, data, timestamp):
+        """
+        Logs data as written at timestamp, in nanoseconds.
+        """
+        data = bytes(data)
+        self.file.write(RECORD.pack(timestamp, len(data)) + data)
+        self.unflushed += 1
+        if self.unflushed >= self.flush_every:
+            self.file.flush()
+            self.unflushed = 0
+
+    def flush(self):
+        self.file.flush()
+        if self.port is not None and hasattr(self.port, 'flush'):
+            self.port.flush()
+
+    def close(self):
+        self.file.close()
+        if self.port is not None:
+            self.port.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name):
+        if name == 'port':
+            raise AttributeError(name)
+        return getattr(self.port, name)
+
+
+class Replayer:
+    """
+    Memory-mapped trace reader.
+
+    Parameters
+    ----------
+    path : str
+        Trace file.
+
+    Attributes
+    ----------
+    offsets : list of int
+        File offset of every complete record.
+
+    start : int
+        Timestamp of the first record, in nanoseconds.
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("{} is not a trace".format(path))
+            size = os.fstat(f.fileno()).st_size
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size > len(MAGIC) else b''
+
+        # index the records up front, ignoring a truncated one at the end
+        self.offsets = []
+        offset = len(MAGIC)
+        while offset + RECORD.size <= size:
+            _, length = RECORD.unpack_from(self.map, offset)
+            if offset + RECORD.size + length > size:
+                break
+            self.offsets.append(offset)
+            offset += RECORD.size + length
+
+        self.start = RECORD.unpack_from(self.map, self.offsets[0])[0] if self.offsets else 0
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def records(self):
+        """
+        Yields the time of every record in seconds since the first, and its octets.
+        """
+        for offset in self.offsets:
+            timestamp, length = RECORD.unpack_from(self.map, offset)
+            data = offset + RECORD.size
+            yield (timestamp - self.start) / 1e9, self.map[data:data + length]
+
+    def octets(self):
+        """
+        Yields every octet of the trace in order, e.g. to feed a simulation testbench.
+        """
+        for _, data in self.records():
+            yield from data
+
+    def duration(self):
+        if not self.offsets:
+            return 0.0
+        return (RECORD.unpack_from(self.map, self.offsets[-1])[0] - self.start) / 1e9
+
+    def replay(self, write, speed=1.0, max_gap=None):
+        """
+        Sends every record to write, at the pace it was recorded.
+
+        Parameters
+        ----------
+        write : callable
+            Called with the octets of each record, e.g. the write method of a serial port.
+
+        speed : float
+            Playback speed; 2 replays twice as fast. 0 sends everything at once.
+
+        max_gap : float or None
+            Longest pause between records, in seconds of the trace. Longer idle periods
+            are shortened to this.
+
+        Returns the number of octets sent, and the worst lateness in seconds of a record
+        behind its schedule.
+        """
+        sent = 0
+        lateness = 0.0
+        begin = time.monotonic()
+        schedule = 0.0
+        last = 0.0
+        for t, data in self.records():
+            gap = t - last
+            last = t
+            if max_gap is not None:
+                gap = min(gap, max_gap)
+            schedule += gap
+
+            if speed:
+                delay = begin + schedule / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    lateness = max(lateness, -delay)
+
+            write(data)
+            sent += len(data)
+        return sent, lateness
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    info = subparsers.add_parser('info', help="summarize a trace")
+    info.add_argument('trace')
+
+    replay = subparsers.add_parser('replay', help="send a trace to a serial port")
+    replay.add_argument('trace')
+    replay.add_argument('port')
+    replay.add_argument('--baud', type=int, default=115200)
+    replay.add_argument('--speed', type=float, default=1.0, help="playback speed, 0 for as fast as possible")
+    replay.add_argument('--max-gap', type=float, help="longest pause between writes, in seconds")
+    args = parser.parse_args()
+
+    with Replayer(args.trace) as trace:
+        if args.command == 'info':
+            octets = sum(len(data) for _, data in trace.records())
+            duration = trace.duration()
+            print("{} records, {} octets over {:.3f}s ({:.0f} octets/s)".format(
+                len(trace), octets, duration, octets / duration if duration else 0))
+        else:
+            import serial
+            with serial.Serial(args.port, args.baud) as port:
+                sent, lateness = trace.replay(port.write, args.speed, args.max_gap)
+                port.flush()
+            print("{} octets sent, at worst {:.1f}ms late".format(sent, lateness * 1000))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
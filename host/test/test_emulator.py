@@ -0,0 +1,292 @@
+from unittest import TestCase, mock
+import os
+import threading
+
+from migen import *
+from migen.build.platforms import icestick
+
+from gateware.top import TopModule
+from ..emulator import Board, Emulator, CLK_FREQ
+from ..lux import (
+    packet, map_payload, range_payload, multicast,
+    BROADCAST, CMD_FRAME, CMD_SYNC, CMD_WRITE_RANGE, CMD_SET_LENGTH, CMD_SET_MAP, CMD_SET_FADE,
+    CMD_SET_PERIOD,
+)
+
+
+def frame(*pixels, destination=BROADCAST):
+    return packet(destination, CMD_FRAME, b''.join(p.to_bytes(3, 'big') for p in pixels))
+
+
+class BoardTestCase(TestCase):
+    def setUp(self):
+        self.board = Board(n_pixels=4, max_pixels=8, address=0x1234, groups=0b10, fade=True, pixel_map=True)
+        self.frames = []
+        self.board.on_frame = lambda now, pixels: self.frames.append(pixels)
+
+    def test_frame_on_tick(self):
+        self.board.feed(frame(1, 2, 3, 4, 5), 0.0)
+        self.assertEqual(self.frames, [])
+        self.board.advance(0.0)
+        self.assertEqual(self.frames, [[1, 2, 3, 4]])
+
+        # no new frame, the old one is refreshed
+        self.board.advance(1 / 60)
+        self.assertEqual(self.frames, [[1, 2, 3, 4]])
+        self.assertEqual(self.board.stats['refreshes'], 2)
+
+    def test_addressing(self):
+        self.board.feed(frame(1, destination=0x1235), 0.0)
+        self.board.feed(frame(2, destination=multicast(0b01)), 0.0)
+        self.assertEqual(self.board.stats['committed'], 0)
+        self.board.feed(frame(3, destination=multicast(0b11)), 0.0)
+        self.board.feed(frame(4, destination=0x1234), 0.0)
+        self.assertEqual(self.board.stats['committed'], 2)
+        self.assertEqual(self.board.stats['dropped'], 1)
+
+    def test_bad_crc(self):
+        self.board.feed(frame(1, 2, 3, 4), 0.0)
+        data = bytearray(frame(5, 6, 7, 8))
+        data[-2] ^= 0xff
+        self.board.feed(data, 0.0)
+        self.board.advance(0.0)
+        self.assertEqual(self.frames, [[1, 2, 3, 4]])
+        self.assertEqual(self.board.stats['errors'], 1)
+
+        # its pixels were rolled back, and never show up, not even with a partial update
+        self.board.feed(packet(BROADCAST, CMD_WRITE_RANGE, range_payload([9])), 0.0)
+        self.board.tick(1.0)
+        self.assertEqual(self.frames[-1], [9, 2, 3, 4])
+
+        # nor do those of a packet cut short by a delimiter
+        self.board.feed(frame(5, 6, 7, 8)[:-6] + b'\0', 1.0)
+        self.board.feed(packet(BROADCAST, CMD_WRITE_RANGE, range_payload([10], start=3)), 1.0)
+        self.board.tick(2.0)
+        self.assertEqual(self.frames[-1], [9, 2, 3, 10])
+        self.assertEqual(self.board.stats['errors'], 2)
+
+    def test_bad_map(self):
+        self.board.feed(packet(BROADCAST, CMD_SET_MAP, map_payload([1, 0])), 0.0)
+        data = bytearray(packet(BROADCAST, CMD_SET_MAP, map_payload([3, 2, 1, 0])))
+        data[-2] ^= 0xff
+        self.board.feed(data, 0.0)
+        self.board.feed(frame(1, 2, 3, 4), 0.0)
+        self.board.tick(0.0)
+        self.assertEqual(self.frames, [[2, 1, 3, 4]])
+        self.assertEqual(self.board.stats['errors'], 1)
+
+    def test_map_entries(self):
+        # entries keep as many bits as a pixel index, like the table in the gateware
+        self.board.feed(packet(BROADCAST, CMD_SET_MAP, map_payload([9, 8])), 0.0)
+        self.board.feed(frame(1, 2, 3, 4), 0.0)
+        self.board.tick(0.0)
+        self.assertEqual(self.frames, [[2, 1, 3, 4]])
+
+        # which may still point past the end of the frame, and pixels mapped there are dropped
+        board = Board(n_pixels=6, max_pixels=6, pixel_map=True)
+        board.feed(packet(BROADCAST, CMD_SET_MAP, map_payload([7, 14, 13, 0, 1, 2])), 0.0)
+        board.feed(frame(1, 2, 3, 4, 5, 6), 0.0)
+        board.tick(0.0)
+        self.assertEqual(board.pixels(), [4, 5, 6, 0, 0, 3])
+
+    def test_sync(self):
+        self.board.feed(packet(BROADCAST, CMD_SET_LENGTH, (2).to_bytes(4, 'little')), 0.0)
+        self.board.feed(packet(BROADCAST, CMD_SET_MAP, map_payload([1, 0])), 0.0)
+        self.board.feed(frame(1, 2), 0.0)
+        self.board.feed(packet(BROADCAST, CMD_SYNC), 0.5)
+        self.assertEqual(self.frames, [[2, 1]])
+        self.assertEqual(self.board.next_tick, 0.5 + 1 / 60)
+
+    def test_write_range(self):
+        self.board.feed(frame(1, 2, 3, 4), 0.0)
+        self.board.tick(0.0)
+        self.board.feed(packet(BROADCAST, CMD_WRITE_RANGE, range_payload([5, 6, 7], start=2)), 0.0)
+        self.board.tick(1.0)
+        self.board.feed(packet(BROADCAST, CMD_WRITE_RANGE, range_payload([8])), 0.0)
+        self.board.tick(2.0)
+        self.assertEqual(self.frames, [[1, 2, 3, 4], [1, 2, 5, 6], [8, 2, 5, 6]])
+
+    def test_fade(self):
+        self.board.feed(frame(0, 0, 0, 0x0000ff), 0.0)
+        self.board.tick(0.0)
+        self.board.feed(packet(BROADCAST, CMD_SET_FADE, (4).to_bytes(4, 'little')), 0.0)
+        self.board.feed(frame(0xffffff, 0x800000, 0, 0), 0.0)
+        for i in range(1, 7):
+            self.board.tick(i)
+
+        self.assertEqual(self.frames, [
+            [0, 0, 0, 0x0000ff],
+            [0x3f3f3f, 0x200000, 0, 0x0000bf],
+            [0x7f7f7f, 0x400000, 0, 0x00007f],
+            [0xbfbfbf, 0x600000, 0, 0x00003f],
+            [0xffffff, 0x800000, 0, 0],
+        ])
+
+    def test_busy(self):
+        self.board.feed(frame(1, 2, 3, 4), 0.0)
+        self.board.tick(0.0)
+
+        # ticks while the frame is clocked out are merged into one, once it is done
+        self.board.feed(frame(5, 6, 7, 8), 0.0)
+        self.board.feed(packet(BROADCAST, CMD_SYNC), self.board.frame_time() / 4)
+        self.board.tick(self.board.frame_time() / 2)
+        self.assertEqual(self.frames, [[1, 2, 3, 4]])
+        self.assertEqual(self.board.stats['skipped'], 1)
+
+        self.board.advance(self.board.frame_time())
+        self.assertEqual(self.frames, [[1, 2, 3, 4], [5, 6, 7, 8]])
+
+
+class EmulatorTestCase(TestCase):
+    def run_emulator(self, baud_rate, data, duration):
+        board = Board()
+        frames = []
+        board.on_frame = lambda now, pixels: frames.append(pixels)
+        emulator = Emulator(board, baud_rate)
+        port = os.open(emulator.port, os.O_WRONLY)
+
+        writer = threading.Thread(target=os.write, args=(port, data), daemon=True)
+        writer.start()
+        try:
+            emulator.run(duration)
+        finally:
+            os.close(port)
+            emulator.close()
+        return board, frames
+
+    def test_frame(self):
+        board, frames = self.run_emulator(1000000, frame(*range(8)), 0.1)
+        self.assertEqual(frames, [list(range(8))])
+
+    def test_line_rate(self):
+        board, frames = self.run_emulator(9600, bytes(2000), 0.5)
+        self.assertLess(board.stats['bytes'], 600)
+        self.assertGreater(board.stats['bytes'], 300)
+
+
+class GatewareTestCase(TestCase):
+    """
+    Runs the same stream through a Board and a simulated TopModule.
+    """
+    BAUD_RATE = 4000000
+    PERIOD = 300
+
+    def simulate(self, data, tail, led='apa102', max_pixels=8, **options):
+        # the simulator drives the clock, rather than a pin
+        with mock.patch('gateware.top.CRG', lambda clk: Module()):
+            top = TopModule(icestick.Platform(), n_pixels=2, max_pixels=max_pixels, led=led, baud_rate=self.BAUD_RATE,
+                            **options)
+        board = Board(n_pixels=2, max_pixels=max_pixels, led=led, **options)
+        pixels = top.blend if options.get('fade') else top.framebuffer
+
+        # start at a short refresh period rather than spend a packet setting it
+        top.scheduler.period.reset = Constant(self.PERIOD, len(top.scheduler.period))
+
+        divisor = CLK_FREQ // self.BAUD_RATE
+        line = [1] * divisor
+        for octet in data:
+            for bit in [0] + [(octet >> n) & 1 for n in range(8)] + [1]:
+                line += [bit] * divisor
+
+        gateware = []
+        emulated = []
+
+        def drive():
+            for level in line:
+                yield top.uart.pads.rx.eq(level)
+                yield
+
+        def record(event, *args):
+            # keeps what the Board displays when the event started a refresh
+            refreshes = board.stats['refreshes']
+            event(*args)
+            if board.stats['refreshes'] != refreshes:
+                emulated.append(board.pixels())
+
+        def monitor():
+            # the Board takes every octet as the gateware does, and sees the same ticks of
+            # the timebase; sync packets tick both by themselves. A tick held back by a busy
+            # strip is let through when the gateware lets its own through, as the Board only
+            # estimates how long the strip takes. The last scanout is seen through to the end
+            cycle = 0
+            while cycle < len(line) + tail or (yield top.framebuffer.started) or (yield pixels.readable):
+                now = cycle / CLK_FREQ
+                if (yield top.cobs.inclk):
+                    record(board.feed, bytes([(yield top.cobs.din)]), now)
+                if (yield top.scheduler.tick) and not (yield top.scheduler.resync):
+                    record(board.tick, now)
+                if (yield top.framebuffer.started) and board.deferred:
+                    record(board.tick, max(now, board.busy_until))
+
+                if (yield top.framebuffer.started):
+                    gateware.append([])
+                if (yield pixels.readable) and (yield pixels.re):
+                    gateware[-1].append((yield pixels.dout))
+                cycle += 1
+                yield
+
+        run_simulation(top, [drive(), monitor()])
+        return gateware, emulated, board
+
+    def test_streamed(self):
+        # a refresh every 300 cycles, less than a frame takes to clock out, while frames
+        # arrive back-to-back every 540 cycles or so
+        data = b'\0' + packet(BROADCAST, CMD_SYNC)
+        for n in range(1, 5):
+            data += frame(n << 16 | 1, n << 16 | 2)
+            if n == 2:
+                damaged = bytearray(frame(0x111111, 0x222222))
+                damaged[-2] ^= 0xff
+                data += bytes(damaged)
+                # the damaged frame's pixels were rolled back, and must not show up with this
+                data += packet(BROADCAST, CMD_WRITE_RANGE, range_payload([0x555555], start=1))
+            if n == 3:
+                # nor may a damaged map swap the pixels of the next frame
+                damaged = bytearray(packet(BROADCAST, CMD_SET_MAP, map_payload([1, 0])))
+                damaged[-2] ^= 0xff
+                data += bytes(damaged)
+
+        gateware, emulated, board = self.simulate(data, 1000, fade=True, pixel_map=True)
+        self.assertEqual(gateware, emulated)
+        self.assertIn([0x020001, 0x555555], gateware)
+        self.assertNotIn(0x111111, sum(gateware, []))
+        self.assertIn([0x040001, 0x040002], gateware)
+
+        # frames were shown while the stream was still running
+        self.assertGreater(len(set(map(tuple, gateware))), 4)
+        self.assertEqual(board.stats['errors'], 2)
+
+    def test_default_build(self):
+        # without the pixel map and the fade, map and fade packets are ignored
+        data = b'\0' + packet(BROADCAST, CMD_SYNC)
+        data += packet(BROADCAST, CMD_SET_FADE, (4).to_bytes(4, 'little'))
+        data += packet(BROADCAST, CMD_SET_MAP, map_payload([1, 0]))
+        data += frame(0x010001, 0x010002)
+        data += packet(BROADCAST, CMD_WRITE_RANGE, range_payload([0x555555], start=1))
+
+        gateware, emulated, board = self.simulate(data, 1000)
+        self.assertEqual(gateware, emulated)
+        self.assertEqual(gateware[-1], [0x010001, 0x555555])
+
+    def test_map_entries(self):
+        # with six pixels, entries are three bits wide: the first pixel is mapped past the
+        # end of the table and dropped, and the second one onto the first
+        data = b'\0' + packet(BROADCAST, CMD_SYNC)
+        data += packet(BROADCAST, CMD_SET_MAP, map_payload([7, 8]))
+        data += frame(0x010001, 0x010002)
+
+        gateware, emulated, board = self.simulate(data, 1000, max_pixels=6, pixel_map=True)
+        self.assertEqual(gateware, emulated)
+        self.assertEqual(gateware[-1], [0x010002, 0])
+
+    def test_sync_while_busy(self):
+        # with timing left to sync packets, a frame and a sync arrive while the strip is
+        # still latching the previous frame; the sync is held back rather than lost
+        data = b'\0' + packet(BROADCAST, CMD_SET_PERIOD, (0).to_bytes(4, 'little'))
+        data += frame(0x010001, 0x010002) + packet(BROADCAST, CMD_SYNC)
+        data += frame(0x020001, 0x020002) + packet(BROADCAST, CMD_SYNC)
+
+        gateware, emulated, board = self.simulate(data, 2000, led='ws2812')
+        self.assertEqual(gateware, emulated)
+        self.assertEqual(gateware[-2:], [[0x010001, 0x010002], [0x020001, 0x020002]])
+        self.assertEqual(board.stats['refreshes'], 2)
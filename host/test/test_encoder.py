@@ -0,0 +1,76 @@
+from unittest import TestCase
+import struct
+
+import numpy as np
+
+from ..encoder import FrameEncoder, cobs_encode
+from .. import lux
+
+
+class COBSTestCase(TestCase):
+    def assertEncodes(self, data):
+        self.assertEqual(cobs_encode(data).tobytes(), lux.cobs_encode(data))
+
+    def test_empty(self):
+        self.assertEncodes(b'')
+
+    def test_zeros(self):
+        self.assertEncodes(b'\0')
+        self.assertEncodes(b'\0\0\x01\0')
+
+    def test_long_runs(self):
+        for n in (253, 254, 255, 508, 509, 1000):
+            self.assertEncodes(b'\x01' * n)
+            self.assertEncodes(b'\x01' * n + b'\0' + b'\x02' * n)
+
+    def test_random(self):
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            data = rng.integers(0, 256, rng.integers(0, 2000), dtype=np.uint8)
+            data[rng.random(len(data)) < 0.99] |= 1 # mostly long runs
+            self.assertEncodes(data.tobytes())
+
+
+class FrameEncoderTestCase(TestCase):
+    def test_matches_reference(self):
+        rng = np.random.default_rng(1)
+        pixels = rng.integers(0, 256, (300, 3), dtype=np.uint8)
+        payload = b''.join(struct.pack('>L', (g << 16) | (r << 8) | b)[1:] for r, g, b in pixels.tolist())
+        self.assertEqual(FrameEncoder(0x1234).encode(pixels), lux.packet(0x1234, lux.CMD_FRAME, payload))
+
+    def test_range(self):
+        pixels = np.array([[1, 2, 3], [4, 5, 6]], dtype=np.uint8)
+        self.assertEqual(FrameEncoder(order='RGB').encode(pixels, start=300),
+            lux.packet(lux.BROADCAST, lux.CMD_WRITE_RANGE, lux.range_payload([0x010203, 0x040506], 300)))
+
+    def test_channel_order(self):
+        pixels = np.array([[1, 2, 3, 4]], dtype=np.uint8)
+        self.assertEqual(FrameEncoder(order='GRB').pixels(pixels).tobytes(), b'\x02\x01\x03')
+        self.assertEqual(FrameEncoder(order='BGR').pixels(pixels[:, :3]).tobytes(), b'\x03\x02\x01')
+        self.assertEqual(FrameEncoder(order='WRG').pixels(pixels).tobytes(), b'\x04\x01\x02')
+        with self.assertRaises(ValueError):
+            FrameEncoder(order='RGW').pixels(pixels[:, :3])
+        for order in ('WRGB', 'RG', ''):
+            with self.assertRaises(ValueError):
+                FrameEncoder(order=order)
+
+    def test_float(self):
+        pixels = np.array([[0.0, 0.5, 1.0]])
+        self.assertEqual(FrameEncoder(order='RGB').pixels(pixels).tobytes(), b'\x00\x80\xff')
+        self.assertEqual(FrameEncoder(order='RGB', brightness=0.5).pixels(pixels).tobytes(), b'\x00\x40\x80')
+        for value in (np.nan, np.inf, -np.inf):
+            with self.assertRaises(ValueError):
+                FrameEncoder(order='RGB').pixels(np.array([[0.0, value, 1.0]]))
+
+    def test_dtype(self):
+        encoder = FrameEncoder(order='RGB')
+        for dtype in (np.int64, np.uint16, np.bool_):
+            with self.assertRaises(ValueError):
+                encoder.pixels(np.array([[255, 128, 0]], dtype=dtype))
+        self.assertEqual(encoder.pixels(np.array([[1.0, 0.5, 0.0]], dtype=np.float32)).tobytes(), b'\xff\x80\x00')
+
+    def test_gamma(self):
+        pixels = np.array([[0, 128, 255]], dtype=np.uint8)
+        encoder = FrameEncoder(order='RGB', gamma=2.0)
+        self.assertEqual(encoder.pixels(pixels).tobytes(), b'\x00\x40\xff')
+        self.assertEqual(encoder.pixels(pixels / 255).tobytes(), b'\x00\x40\xff')
@@ -0,0 +1,145 @@
+from unittest import TestCase, mock
+import io
+import os
+import tempfile
+import time
+
+from migen import *
+from migen.build.platforms import icestick
+
+from gateware.top import TopModule
+from ..record import Recorder, Replayer
+from ..emulator import Board, CLK_FREQ
+from ..lux import packet, BROADCAST, CMD_FRAME, CMD_SYNC
+
+
+class RecordTestCase(TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        os.unlink(self.path)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def record(self, writes, start=1600000000 * 10**9):
+        with Recorder(None, self.path) as recorder:
+            for t, data in writes:
+                recorder.record(data, start + int(t * 1e9))
+
+    def test_write_through(self):
+        port = io.BytesIO()
+        recorder = Recorder(port, self.path)
+        recorder.write(b'abc')
+        recorder.write(b'\0de')
+        self.assertEqual(port.getvalue(), b'abc\0de')
+        recorder.close()
+
+        with Replayer(self.path) as trace:
+            self.assertEqual(len(trace), 2)
+            self.assertEqual(b''.join(data for _, data in trace.records()), b'abc\0de')
+
+    def test_flushed(self):
+        # records reach the file as they are written, without closing the recorder
+        recorder = Recorder(None, self.path)
+        recorder.write(b'abc')
+        recorder.write(b'de')
+        with Replayer(self.path) as trace:
+            self.assertEqual(bytes(trace.octets()), b'abcde')
+            self.assertGreaterEqual(trace.duration(), 0)
+        recorder.close()
+
+        recorder = Recorder(None, self.path, flush_every=2)
+        recorder.write(b'f')
+        with Replayer(self.path) as trace:
+            self.assertEqual(len(trace), 2)
+        recorder.write(b'g')
+        with Replayer(self.path) as trace:
+            self.assertEqual(bytes(trace.octets()), b'abcdefg')
+        recorder.close()
+
+    def test_append(self):
+        self.record([(0, b'a'), (1, b'b')])
+        self.record([(2, b'c')])
+        with Replayer(self.path) as trace:
+            self.assertEqual([(t, data) for t, data in trace.records()], [(0, b'a'), (1, b'b'), (2, b'c')])
+            self.assertEqual(trace.duration(), 2)
+
+    def test_truncated(self):
+        self.record([(0, b'abc'), (1, b'defg')])
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        with Replayer(self.path) as trace:
+            self.assertEqual(bytes(trace.octets()), b'abc')
+
+    def test_empty(self):
+        self.record([])
+        with Replayer(self.path) as trace:
+            self.assertEqual(len(trace), 0)
+            self.assertEqual(trace.replay(lambda data: None), (0, 0.0))
+
+    def test_not_a_trace(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'something else')
+        with self.assertRaises(ValueError):
+            Replayer(self.path)
+
+    def test_speed(self):
+        self.record([(0, b'a'), (0.2, b'b'), (0.4, b'c'), (100, b'd')])
+        times = []
+        with Replayer(self.path) as trace:
+            start = time.monotonic()
+            sent, lateness = trace.replay(lambda data: times.append(time.monotonic() - start), speed=4, max_gap=0.2)
+        self.assertEqual(sent, 4)
+        for actual, expected in zip(times, [0, 0.05, 0.1, 0.15]):
+            self.assertAlmostEqual(actual, expected, delta=0.02)
+
+    def test_replay_to_board(self):
+        self.record([
+            (0.0, packet(BROADCAST, CMD_FRAME, bytes(range(24)))),
+            (0.5, packet(BROADCAST, CMD_SYNC)),
+        ])
+        board = Board()
+        frames = []
+        board.on_frame = lambda now, pixels: frames.append(pixels)
+        with Replayer(self.path) as trace:
+            for t, data in trace.records():
+                board.feed(data, t)
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0][0], 0x000102)
+
+    def test_replay_to_gateware(self):
+        # the octets of a trace, played into the simulated gateware at line rate
+        self.record([
+            (0.0, b'\0' + packet(BROADCAST, CMD_FRAME, bytes(range(6)))),
+            (0.5, packet(BROADCAST, CMD_SYNC)),
+        ])
+        baud_rate = 4000000
+        with mock.patch('gateware.top.CRG', lambda clk: Module()):
+            top = TopModule(icestick.Platform(), n_pixels=2, max_pixels=8, baud_rate=baud_rate)
+
+        divisor = CLK_FREQ // baud_rate
+        line = [1] * divisor
+        with Replayer(self.path) as trace:
+            for octet in trace.octets():
+                for bit in [0] + [(octet >> n) & 1 for n in range(8)] + [1]:
+                    line += [bit] * divisor
+
+        frames = []
+
+        def drive():
+            for level in line:
+                yield top.uart.pads.rx.eq(level)
+                yield
+
+        def monitor():
+            # long enough for the strip to clock out the frame after the sync
+            for _ in range(len(line) + 2000):
+                if (yield top.framebuffer.started):
+                    frames.append([])
+                if (yield top.framebuffer.readable) and (yield top.framebuffer.re):
+                    frames[-1].append((yield top.framebuffer.dout))
+                yield
+
+        run_simulation(top, [drive(), monitor()])
+        self.assertEqual(frames[-1], [0x000102, 0x030405])